@@ -0,0 +1,18 @@
+"""Settings every benchmark runs the app with, in process or under uvicorn.
+
+Kept free of app imports, so `benchmarks.load` can build its server's
+environment without configuring its own process.
+"""
+
+from collections.abc import MutableMapping
+
+
+def benchmark_env(env: MutableMapping[str, str]) -> MutableMapping[str, str]:
+    """Fill in the settings the app requires, unless already set, and turn
+    the rate limits off so the app is measured rather than its limits."""
+    env.setdefault('SECRET_KEY', 'benchmark-secret-key-not-for-production')
+    env.setdefault('ALGORITHM', 'HS256')
+    env.setdefault('ACESS_TOKEN_EXPIRE_MINUTES', '30')
+    for name in ('AUTH', 'USERS', 'TODO'):
+        env.setdefault(f'RATE_LIMIT_{name}_PER_SECOND', '0')
+    return env
@@ -0,0 +1,96 @@
+"""Setup shared by the in-process benchmarks; import it before fast_api.
+
+Configures the app with warmup and background jobs off, and provides the
+seeding and the TestClient wired to a scratch database.
+"""
+
+import os
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+
+from benchmarks._env import benchmark_env
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///benchmark.db')
+os.environ.setdefault('WARMUP_ENABLED', 'false')
+os.environ.setdefault('JOBS_ENABLED', 'false')
+benchmark_env(os.environ)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.ext.asyncio import (  # noqa: E402
+    AsyncSession,
+    create_async_engine,
+)
+from sqlalchemy.pool import NullPool  # noqa: E402
+
+from fast_api.app import app  # noqa: E402
+from fast_api.database import get_session_factory  # noqa: E402
+from fast_api.hashing import get_password_hash  # noqa: E402
+from fast_api.models import Todo, TodoState, User, table_registry  # noqa
+from fast_api.security import password_hasher, user_cache  # noqa: E402
+
+PASSWORD = 'benchmark'
+EMAIL = 'bench@bench.com'
+
+
+def seed_todos(
+    path: Path, todos: int, description: str = 'description {}'
+) -> None:
+    """One user (id 1) owning `todos` todos, inserted in bulk."""
+    engine = create_engine(f'sqlite:///{path}')
+    table_registry.metadata.create_all(engine)
+    states = list(TodoState)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [
+                {
+                    'username': 'bench',
+                    'email': EMAIL,
+                    'password': get_password_hash(PASSWORD),
+                }
+            ],
+        )
+        conn.execute(
+            insert(Todo),
+            [
+                {
+                    'title': f'todo {i}',
+                    'description': description.format(i),
+                    'state': states[i % len(states)],
+                    'user_id': 1,
+                }
+                for i in range(todos)
+            ],
+        )
+    engine.dispose()
+
+
+@contextmanager
+def serve(path: Path):
+    """A TestClient whose sessions all open on the database at `path`."""
+    engine = create_async_engine(
+        f'sqlite+aiosqlite:///{path}', poolclass=NullPool
+    )
+
+    @asynccontextmanager
+    async def session_factory(read_only=False):
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+        user_cache.clear()
+        password_hasher.shutdown()
+
+
+def login(client: TestClient, email: str = EMAIL) -> dict:
+    response = client.post(
+        '/auth/token', data={'username': email, 'password': PASSWORD}
+    )
+    response.raise_for_status()
+    return {'Authorization': f'Bearer {response.json()["access_token"]}'}
@@ -0,0 +1,289 @@
+"""Per-endpoint latency for the auth, users and todo routers.
+
+Seeds a temporary SQLite database with `UserFactory`/`TodoFactory`, times
+every endpoint through `TestClient`, writes the results as JSON and
+compares them with a stored baseline. Exits with status 1 when an endpoint's
+median is slower than the baseline by more than `--threshold`.
+
+    python -m benchmarks.endpoints
+    python -m benchmarks.endpoints --update-baseline
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import factory.random
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from benchmarks._setup import PASSWORD, login, serve
+from fast_api.hashing import get_password_hash
+from fast_api.models import table_registry
+from tests.conftest import TodoFactory, UserFactory
+
+BASELINE = Path(__file__).with_name('baseline.json')
+
+
+def seed(path: Path, users: int, todos: int) -> None:
+    """One benchmark user (id 1) plus `users - 1` others, each with `todos`
+    todos, so per-user queries run against a shared table."""
+    factory.random.reseed_random('fast_api-benchmarks')
+    engine = create_engine(f'sqlite:///{path}', poolclass=NullPool)
+    table_registry.metadata.create_all(engine)
+    hashed = get_password_hash(PASSWORD)
+    with Session(engine) as session:
+        session.add_all(UserFactory.build_batch(users, password=hashed))
+        session.flush()
+        for user_id in range(1, users + 1):
+            session.add_all(TodoFactory.build_batch(todos, user_id=user_id))
+        session.commit()
+    engine.dispose()
+
+
+class Context:
+    def __init__(self, client: TestClient, user: dict):
+        self.client = client
+        self.user = user
+        self.headers = login(client, user['email'])
+        self.counter = itertools.count()
+
+    def new_todo(self) -> int:
+        response = self.client.post(
+            '/todos/',
+            headers=self.headers,
+            json={'title': 'bench', 'description': 'bench', 'state': 'todo'},
+        )
+        response.raise_for_status()
+        return response.json()['id']
+
+    def new_user(self) -> tuple[int, dict]:
+        name = f'bench{next(self.counter)}'
+        response = self.client.post(
+            '/users/',
+            json={
+                'username': name,
+                'email': f'{name}@bench.com',
+                'password': PASSWORD,
+            },
+        )
+        response.raise_for_status()
+        return response.json()['id'], login(self.client, f'{name}@bench.com')
+
+
+def todo_payload(n: int) -> dict:
+    return {'title': f'todo {n}', 'description': 'bench', 'state': 'draft'}
+
+
+def create_user(ctx: Context):
+    name = f'new{next(ctx.counter)}'
+    payload = {
+        'username': name,
+        'email': f'{name}@bench.com',
+        'password': PASSWORD,
+    }
+    return 'POST', '/users/', {'json': payload}
+
+
+def delete_user(ctx: Context):
+    user_id, headers = ctx.new_user()
+    return 'DELETE', f'/users/{user_id}', {'headers': headers}
+
+
+# name -> setup(ctx) returning the (untimed) request to time
+CASES = {
+    'auth.token': lambda ctx: (
+        'POST',
+        '/auth/token',
+        {'data': {'username': ctx.user['email'], 'password': PASSWORD}},
+    ),
+    'auth.refresh_token': lambda ctx: (
+        'POST',
+        '/auth/refresh_token',
+        {'headers': ctx.headers},
+    ),
+    'users.create': create_user,
+    'users.list': lambda ctx: ('GET', '/users/?limit=50', {}),
+    'users.read': lambda ctx: ('GET', f'/users/{ctx.user["id"]}', {}),
+    'users.update': lambda ctx: (
+        'PUT',
+        f'/users/{ctx.user["id"]}',
+        {
+            'headers': ctx.headers,
+            'json': {
+                'username': ctx.user['username'],
+                'email': ctx.user['email'],
+                'password': PASSWORD,
+            },
+        },
+    ),
+    'users.delete': delete_user,
+    'todos.create': lambda ctx: (
+        'POST',
+        '/todos/',
+        {'headers': ctx.headers, 'json': todo_payload(next(ctx.counter))},
+    ),
+    'todos.create_batch': lambda ctx: (
+        'POST',
+        '/todos/batch',
+        {
+            'headers': ctx.headers,
+            'json': [todo_payload(n) for n in range(100)],
+        },
+    ),
+    'todos.list': lambda ctx: (
+        'GET',
+        '/todos/?limit=100',
+        {'headers': ctx.headers},
+    ),
+    'todos.list_filtered': lambda ctx: (
+        'GET',
+        '/todos/?state=done&limit=100',
+        {'headers': ctx.headers},
+    ),
+    'todos.search': lambda ctx: (
+        'GET',
+        '/todos/?q=data&limit=100',
+        {'headers': ctx.headers},
+    ),
+    'todos.stats': lambda ctx: (
+        'GET',
+        '/todos/stats',
+        {'headers': ctx.headers},
+    ),
+    'todos.export': lambda ctx: (
+        'GET',
+        '/todos/export?format=ndjson',
+        {'headers': ctx.headers},
+    ),
+    'todos.patch': lambda ctx: (
+        'PATCH',
+        f'/todos/{ctx.todo_id}',
+        {'headers': ctx.headers, 'json': {'state': 'doing'}},
+    ),
+    'todos.delete': lambda ctx: (
+        'DELETE',
+        f'/todos/{ctx.new_todo()}',
+        {'headers': ctx.headers},
+    ),
+    'todos.bulk_patch': lambda ctx: (
+        'PATCH',
+        '/todos/',
+        {
+            'headers': ctx.headers,
+            'json': {'state': 'trash', 'update': {'state': 'trash'}},
+        },
+    ),
+    'todos.bulk_delete': lambda ctx: (
+        'DELETE',
+        f'/todos/?ids={ctx.new_todo()}&ids={ctx.new_todo()}',
+        {'headers': ctx.headers},
+    ),
+}
+
+
+def run_case(ctx: Context, setup, repeat: int, warmup: int) -> dict:
+    samples = []
+    for i in range(warmup + repeat):
+        method, url, kwargs = setup(ctx)
+        start = time.perf_counter()
+        response = ctx.client.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        if i >= warmup:
+            samples.append(elapsed * 1000)
+
+    samples.sort()
+    return {
+        'median_ms': statistics.median(samples),
+        'mean_ms': statistics.fmean(samples),
+        'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'stdev_ms': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'repeat': len(samples),
+    }
+
+
+def run(args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'endpoints.db'
+        seed(path, args.users, args.todos)
+        with serve(path) as client:
+            user = client.get('/users/1').json()
+            ctx = Context(client, user)
+            ctx.todo_id = ctx.new_todo()
+            results = {
+                name: run_case(ctx, CASES[name], args.repeat, args.warmup)
+                for name in args.only or CASES
+            }
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'users': args.users,
+            'todos_per_user': args.todos,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    print(
+        f'{"endpoint":<22} {"median ms":>10} {"p95 ms":>10} '
+        f'{"baseline":>10} {"change":>8}'
+    )
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        line = (
+            f'{name:<22} {result["median_ms"]:>10.2f} '
+            f'{result["p95_ms"]:>10.2f}'
+        )
+        if base:
+            change = result['median_ms'] / base['median_ms'] - 1
+            line += f' {base["median_ms"]:>10.2f} {change:>+8.1%}'
+            if change > threshold:
+                regressions.append(name)
+                line += '  REGRESSION'
+        print(line)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--todos', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--threshold', type=float, default=0.25)
+    parser.add_argument('--only', nargs='+', choices=sorted(CASES))
+    parser.add_argument('--output', type=Path, default=Path('results.json'))
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    current = run(args)
+    args.output.write_text(json.dumps(current, indent=2) + '\n')
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(current, indent=2) + '\n')
+
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+    regressions = compare(current, baseline, args.threshold)
+    if regressions:
+        print(f'\nslower than baseline: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
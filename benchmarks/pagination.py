@@ -0,0 +1,67 @@
+"""Offset vs. cursor pagination latency across page depth.
+
+Seeds one user with many todos and times `GET /todos/` at increasing page
+depths, once with `offset` and once with the equivalent `cursor`.
+
+    python -m benchmarks.pagination --todos 200000 --limit 50
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from benchmarks._setup import login, seed_todos, serve
+from fast_api.pagination import encode_cursor
+
+
+def timed(client: TestClient, url: str, headers: dict, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        samples.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--todos', type=int, default=100_000)
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'pagination.db'
+        seed_todos(path, args.todos)
+        with serve(path) as client:
+            headers = login(client)
+
+            print(f'{"depth":>10} {"offset ms":>10} {"cursor ms":>10}')
+            depth = args.limit
+            while depth < args.todos:
+                offset_ms = timed(
+                    client,
+                    f'/todos/?limit={args.limit}&offset={depth}',
+                    headers,
+                    args.repeat,
+                )
+                # ids are sequential from 1, so the row before `depth` is
+                # exactly what a client would hold as its cursor
+                cursor_ms = timed(
+                    client,
+                    f'/todos/?limit={args.limit}'
+                    f'&cursor={encode_cursor(depth)}',
+                    headers,
+                    args.repeat,
+                )
+                print(f'{depth:>10} {offset_ms:>10.2f} {cursor_ms:>10.2f}')
+                depth *= 4
+
+
+if __name__ == '__main__':
+    main()
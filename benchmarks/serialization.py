@@ -0,0 +1,51 @@
+"""`GET /todos/` latency for one large page, with and without the fast
+list path (`FAST_LIST_RESPONSES`).
+
+    python -m benchmarks.serialization --todos 1000
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks._setup import login, seed_todos, serve
+from fast_api import pagination
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--todos', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'serialization.db'
+        seed_todos(
+            path, args.todos, description='a somewhat longer description {}'
+        )
+        with serve(path) as client:
+            headers = login(client)
+            url = f'/todos/?limit={args.todos}'
+
+            print(f'{"mode":<12} {"median ms":>10} {"p95 ms":>10}')
+            for fast in (False, True):
+                pagination.settings.FAST_LIST_RESPONSES = fast
+                samples = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    response = client.get(url, headers=headers)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    response.raise_for_status()
+                samples.sort()
+                p95 = samples[int(len(samples) * 0.95) - 1]
+                mode = 'fast' if fast else 'validated'
+                print(
+                    f'{mode:<12} {statistics.median(samples):>10.2f} '
+                    f'{p95:>10.2f}'
+                )
+
+
+if __name__ == '__main__':
+    main()
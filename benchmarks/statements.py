@@ -0,0 +1,105 @@
+"""CPU time per lookup with statements built per call vs. prebuilt.
+
+Runs the per-request lookups against an in-memory SQLite database, so
+the time is mostly SQLAlchemy's: building the construct, its cache key
+and the ORM result handling.
+
+    python -m benchmarks.statements --repeat 5000
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///benchmark.db')
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key-not-for-production')
+os.environ.setdefault('ALGORITHM', 'HS256')
+os.environ.setdefault('ACESS_TOKEN_EXPIRE_MINUTES', '30')
+
+from sqlalchemy import create_engine, select, update  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from fast_api.models import Todo, TodoState, User, table_registry  # noqa
+from fast_api.statements import (  # noqa: E402
+    TODO_OF_USER,
+    USER_BY_EMAIL,
+    USER_BY_ID,
+    update_todo_of_user,
+)
+
+EMAIL = 'bench@bench.com'
+
+CASES = {
+    'user by email': (
+        lambda s: s.scalar(select(User).where(User.email == EMAIL)),
+        lambda s: s.scalar(USER_BY_EMAIL, {'email': EMAIL}),
+    ),
+    'user by id': (
+        lambda s: s.scalar(select(User).where(User.id == 1)),
+        lambda s: s.scalar(USER_BY_ID, {'user_id': 1}),
+    ),
+    'todo of user': (
+        lambda s: s.scalar(
+            select(Todo).where(Todo.user_id == 1, Todo.id == 1)
+        ),
+        lambda s: s.scalar(TODO_OF_USER, {'owner_id': 1, 'todo_id': 1}),
+    ),
+    'patch todo': (
+        lambda s: s.scalar(
+            update(Todo)
+            .values(title='patched')
+            .returning(Todo)
+            .where(Todo.user_id == 1, Todo.id == 1)
+        ),
+        lambda s: s.scalar(
+            update_todo_of_user(frozenset({'title'})),
+            {'title': 'patched', 'owner_id': 1, 'todo_id': 1},
+        ),
+    ),
+}
+
+
+def seed(session: Session) -> None:
+    session.add(User(username='bench', email=EMAIL, password='x'))
+    session.flush()
+    session.add(
+        Todo(title='todo', description='', state=TodoState.todo, user_id=1)
+    )
+    session.commit()
+
+
+def cpu_us(run, session: Session, repeat: int) -> float:
+    run(session)
+    start = time.process_time()
+    for _ in range(repeat):
+        run(session)
+    session.rollback()
+    return (time.process_time() - start) / repeat * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    table_registry.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session)
+
+        print(
+            f'{"lookup":<16} {"built us":>10} {"prebuilt us":>12} {"saved":>8}'
+        )
+        for name, (built, prebuilt) in CASES.items():
+            before = cpu_us(built, session, args.repeat)
+            after = cpu_us(prebuilt, session, args.repeat)
+            print(
+                f'{name:<16} {before:>10.1f} {after:>12.1f} '
+                f'{1 - after / before:>8.0%}'
+            )
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
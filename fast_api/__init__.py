@@ -0,0 +1,4 @@
+import time
+
+# start of the app's imports, for the cold start report in fast_api.warmup
+IMPORT_STARTED = time.perf_counter()
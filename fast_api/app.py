@@ -1,16 +1,52 @@
+import time
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 
 from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 
-from fast_api.routers import auth, todo, users
+import fast_api
+from fast_api.database import engine, session_scope
+from fast_api.jobs import JobRunner, default_jobs, throttle_for
+from fast_api.metrics import PrometheusMiddleware, metrics_response
+from fast_api.routers import auth, health, todo, users
 from fast_api.schemas import Message
+from fast_api.security import password_hasher
+from fast_api.settings import get_settings
+from fast_api.warmup import ColdStartTimer, record, warmup
 
-app = FastAPI()
+settings = get_settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.WARMUP_ENABLED:
+        await warmup(session_scope, engine, settings.WARMUP_CONNECTIONS)
+    jobs = JobRunner(
+        session_scope,
+        default_jobs(
+            throttle_for(engine.pool, settings.JOBS_BATCH_PAUSE_SECONDS)
+        ),
+        settings.JOBS_INTERVAL_SECONDS,
+    )
+    if settings.JOBS_ENABLED:
+        jobs.start()
+    yield
+    await jobs.stop()
+    # the lifespan ends as the worker process exits, with os._exit() under
+    # uvicorn, which skips the atexit hook that would otherwise stop the
+    # hashing workers
+    password_hasher.shutdown(wait=True)
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+app.add_middleware(PrometheusMiddleware)
+app.add_middleware(ColdStartTimer)
 
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(todo.router)
+app.include_router(health.router)
 
 
 @app.get('/', status_code=HTTPStatus.OK, response_model=Message)
@@ -32,3 +68,11 @@ def hello_world():
         </body>
         </html>"""
     return html_content
+
+
+@app.get('/metrics', include_in_schema=False)
+def metrics():
+    return metrics_response()
+
+
+record('import', time.perf_counter() - fast_api.IMPORT_STARTED)
@@ -0,0 +1,119 @@
+"""Moving old trash out of todos.
+
+Todos that have been in trash, untouched, for longer than
+TODO_ARCHIVE_AFTER_DAYS are moved to todos_archive, so the lists, indexes
+and backups of the hot table only carry live rows. Each batch is one
+DELETE ... RETURNING from todos and one INSERT into the archive, in the
+same transaction. The background jobs (fast_api.jobs) run it
+periodically; to run it by hand:
+
+    python -m fast_api.archive [--days DAYS]
+"""
+
+import argparse
+import asyncio
+from datetime import timedelta
+
+from sqlalchemy import delete, func, insert, select
+
+from fast_api.database import session_scope
+from fast_api.models import ArchivedTodo, Todo, TodoState
+from fast_api.revocation import utcnow
+from fast_api.settings import get_settings
+
+settings = get_settings()
+
+ARCHIVED_COLUMNS = (
+    Todo.title,
+    Todo.description,
+    Todo.state,
+    Todo.user_id,
+    Todo.created_at,
+    Todo.updated_at,
+)
+
+
+async def archive_trash(
+    session, older_than: timedelta, batch_size: int, throttle=None
+) -> int:
+    """Move todos in trash since before `older_than` ago to todos_archive,
+    committing every `batch_size` rows and awaiting `throttle()`, if given,
+    between batches. Returns how many were moved."""
+    # a todo's last change is taken as the time it went to trash
+    cutoff = utcnow() - older_than
+    batch = (
+        select(Todo.id)
+        .where(
+            Todo.state == TodoState.trash,
+            func.coalesce(Todo.updated_at, Todo.created_at) < cutoff,
+        )
+        .order_by(Todo.id)
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+
+    moved = 0
+    while True:
+        # the state is checked again in case the todo left trash meanwhile
+        rows = await session.execute(
+            delete(Todo)
+            .where(Todo.id.in_(batch), Todo.state == TodoState.trash)
+            .returning(*ARCHIVED_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        rows = [row._asdict() for row in rows]
+        if rows:
+            await session.execute(insert(ArchivedTodo), rows)
+        await session.commit()
+
+        moved += len(rows)
+        if len(rows) < batch_size:
+            return moved
+        if throttle:
+            await throttle()
+
+
+async def restore_archived(session, user_id: int, archived_id: int):
+    """Move an archived todo back into todos, as a new todo to do.
+
+    Returns the restored Todo, or None if the user has no such archived
+    todo. The caller commits.
+    """
+    row = (
+        await session.execute(
+            delete(ArchivedTodo)
+            .where(
+                ArchivedTodo.user_id == user_id, ArchivedTodo.id == archived_id
+            )
+            .returning(
+                ArchivedTodo.title,
+                ArchivedTodo.description,
+                ArchivedTodo.created_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+    ).first()
+    if row is None:
+        return None
+
+    return await session.scalar(
+        insert(Todo)
+        .values(**row._asdict(), state=TodoState.todo, user_id=user_id)
+        .returning(Todo)
+    )
+
+
+async def main(days: float) -> None:  # pragma: no cover
+    async with session_scope() as session:
+        moved = await archive_trash(
+            session, timedelta(days=days), settings.JOBS_BATCH_SIZE
+        )
+    print(f'{moved} todos archived')
+
+
+if __name__ == '__main__':  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Archive old trash.')
+    parser.add_argument(
+        '--days', type=float, default=settings.TODO_ARCHIVE_AFTER_DAYS
+    )
+    asyncio.run(main(parser.parse_args().days))
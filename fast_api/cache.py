@@ -0,0 +1,92 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from prometheus_client import Counter
+
+LOOKUPS = Counter(
+    'cache_lookups_total',
+    'Lookups in named in-process caches, by result (hit, miss).',
+    ['cache', 'result'],
+)
+
+
+class TTLCache:
+    """Bounded mapping with per-entry expiry and LRU eviction.
+
+    Not thread-safe: it is meant to be used from the event loop only.
+    A cache given a `name` also counts its lookups in /metrics.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+        name: str | None = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._hit = self._miss = None
+        if name:
+            self._hit = LOOKUPS.labels(name, 'hit')
+            self._miss = LOOKUPS.labels(name, 'miss')
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Any | None:
+        entry = self._data.get(key)
+        if entry is None:
+            self._count_miss()
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._data[key]
+            self._count_miss()
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        if self._hit:
+            self._hit.inc()
+        return value
+
+    def _count_miss(self) -> None:
+        self.misses += 1
+        if self._miss:
+            self._miss.inc()
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._data[key] = (self.clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[Any], bool]) -> None:
+        for key in [k for k, (_, v) in self._data.items() if predicate(v)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
@@ -0,0 +1,80 @@
+"""Support for GET /todos/changes, the delta sync of a user's todos.
+
+Created and updated todos are found by `updated_at`, which every write
+sets. Deleted todos leave a row in todo_tombstones, written by a trigger
+on todos whatever the write path (single and bulk deletes, archiving,
+cascades), and kept for TODO_CHANGES_RETENTION_DAYS.
+
+The `since` token wraps the newest timestamp a client has seen. Changes
+are read again from a little before it: timestamps can be as coarse as a
+second, and a transaction can commit after a later one, so clients must
+apply changes idempotently.
+"""
+
+import base64
+import binascii
+import json
+from datetime import UTC, datetime, timedelta
+from http import HTTPStatus
+
+from fastapi import HTTPException
+
+from fast_api.models import Todo, register_ddl
+
+OVERLAP = timedelta(seconds=10)
+
+SQLITE_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS todo_tombstones_ad AFTER DELETE ON todos
+    BEGIN
+        INSERT INTO todo_tombstones (todo_id, user_id)
+        VALUES (old.id, old.user_id);
+    END
+    """,
+]
+
+POSTGRES_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION record_todo_tombstones() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO todo_tombstones (todo_id, user_id)
+        SELECT id, user_id FROM old_rows;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER todo_tombstones_ad AFTER DELETE ON todos
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION record_todo_tombstones()
+    """,
+]
+
+register_ddl(Todo.__table__, sqlite=SQLITE_DDL, postgresql=POSTGRES_DDL)
+
+
+def encode_since(at: datetime) -> str:
+    payload = json.dumps({'at': at.isoformat()}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_since(token: str) -> datetime:
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        at = datetime.fromisoformat(
+            json.loads(base64.urlsafe_b64decode(padded))['at']
+        )
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Invalid since token.'
+        )
+    # the columns hold naive UTC timestamps
+    if at.tzinfo is not None:
+        at = at.astimezone(UTC).replace(tzinfo=None)
+    return at
+
+
+def latest(since: datetime | None, *timestamps: datetime) -> datetime | None:
+    """The next watermark: the newest timestamp seen so far."""
+    return max((at for at in (since, *timestamps) if at), default=None)
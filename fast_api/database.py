@@ -1,11 +1,316 @@
-from sqlalchemy import create_engine
+import itertools
+import time
+from collections.abc import Callable
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+from fast_api.cache import TTLCache
+from fast_api.pool_metrics import PoolMetrics, instrumented_pool_class
+from fast_api.settings import get_settings
+from fast_api.statements import CompiledCacheStats
+
+settings = get_settings()
+
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg'}
+MEMORY_DBS = {None, '', ':memory:'}
+READ_METHODS = {'GET', 'HEAD'}
+
+
+def to_async_url(url: str) -> str:
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS:
+        url = url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+    return url.render_as_string(hide_password=False)
+
+
+def sync_connect_args(url: str) -> dict:
+    # the sync session hops between threadpool threads
+    if make_url(url).get_backend_name() == 'sqlite':
+        return {'check_same_thread': False}
+    return {}
+
+
+def pool_options(url: str, is_async: bool, metrics: PoolMetrics) -> dict:
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database in MEMORY_DBS:
+        # in-memory sqlite needs its single-connection pool
+        return {}
+    return {
+        'poolclass': instrumented_pool_class(is_async, metrics),
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+    }
+
+
+class ThreadedStream:
+    """Async iteration over a sync streaming result, fetched in the
+    threadpool one partition at a time."""
+
+    def __init__(self, result):
+        self._result = result
+
+    async def partitions(self, size: int | None = None):
+        while rows := await run_in_threadpool(self._result.fetchmany, size):
+            yield rows
+
+
+class ThreadedSession:
+    """Async facade over a sync Session.
+
+    Exposes the subset of the AsyncSession API used by the routers, running
+    every database round trip in Starlette's threadpool. This is the old
+    behaviour, kept behind DATABASE_MODE='sync' for throughput comparisons.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def get_bind(self, *args, **kwargs):
+        return self.sync_session.get_bind(*args, **kwargs)
+
+    def add(self, instance) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.sync_session.add_all(instances)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.scalar, statement, *args, **kwargs
+        )
+
+    async def scalars(self, statement, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.scalars, statement, *args, **kwargs
+        )
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.execute, statement, *args, **kwargs
+        )
+
+    async def stream(self, statement, *args, **kwargs):
+        result = await run_in_threadpool(
+            self.sync_session.execute,
+            statement.execution_options(stream_results=True),
+            *args,
+            **kwargs,
+        )
+        return ThreadedStream(result)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.get, entity, ident, **kwargs
+        )
+
+    async def merge(self, instance, *, load: bool = True):
+        return await run_in_threadpool(
+            self.sync_session.merge, instance, load=load
+        )
+
+    async def delete(self, instance) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def refresh(self, instance, attribute_names=None) -> None:
+        await run_in_threadpool(
+            self.sync_session.refresh, instance, attribute_names
+        )
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+
+class ReplicaSet:
+    """Round-robin over read replicas, skipping the ones that failed.
+
+    A replica whose connection fails or drops is left out for
+    `retry_seconds`, then tried again by the next request that picks it.
+    """
+
+    def __init__(
+        self,
+        engines: list[Engine],
+        retry_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.engines = engines
+        self.retry_seconds = retry_seconds
+        self.clock = clock
+        self._down_until: dict[Engine, float] = {}
+        self._turn = itertools.count()
+        for replica in engines:
+            event.listen(replica, 'handle_error', self.on_error)
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    def on_error(self, context) -> None:
+        # no connection means connecting itself failed
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(context.engine)
+
+    def mark_down(self, replica: Engine) -> None:
+        self._down_until[replica] = self.clock() + self.retry_seconds
+
+    def is_healthy(self, replica: Engine) -> bool:
+        return self._down_until.get(replica, 0) <= self.clock()
+
+    def choose(self) -> Engine | None:
+        """The next healthy replica, or None to read from the primary."""
+        for _ in self.engines:
+            replica = self.engines[next(self._turn) % len(self.engines)]
+            if self.is_healthy(replica):
+                return replica
+        return None
+
+    def status(self) -> list[dict]:
+        return [
+            {
+                'url': replica.url.render_as_string(hide_password=True),
+                'healthy': self.is_healthy(replica),
+            }
+            for replica in self.engines
+        ]
+
+
+class RoutingSession(Session):
+    """Session that reads from one replica and writes to the primary.
+
+    Once the session flushes or executes an INSERT/UPDATE/DELETE it stays
+    pinned to the primary, so it reads its own writes from then on.
+    """
+
+    def __init__(self, *args, replicas: ReplicaSet, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.replica: Engine | None = None
+        self.pinned = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.pinned = True
+        if not self.pinned:
+            self.replica = self.replica or self.replicas.choose()
+            if self.replica is not None:
+                return self.replica
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def replica_engine(url: str, metrics: PoolMetrics):
+    if settings.DATABASE_MODE == 'sync':
+        return create_engine(
+            url,
+            echo=False,
+            connect_args=sync_connect_args(url),
+            **pool_options(url, False, metrics),
+        )
+    return create_async_engine(
+        to_async_url(url), echo=False, **pool_options(url, True, metrics)
+    ).sync_engine
+
+
+pool_metrics = PoolMetrics()
+replica_pool_metrics = PoolMetrics()
+compiled_cache_stats = CompiledCacheStats()
+
+if settings.DATABASE_MODE == 'sync':
+    engine = create_engine(
+        settings.DATABASE_URL,
+        echo=False,
+        connect_args=sync_connect_args(settings.DATABASE_URL),
+        **pool_options(settings.DATABASE_URL, False, pool_metrics),
+    )
+    pool_metrics.listen(engine)
+    compiled_cache_stats.listen(engine)
+else:
+    engine = create_async_engine(
+        to_async_url(settings.DATABASE_URL),
+        echo=False,
+        **pool_options(settings.DATABASE_URL, True, pool_metrics),
+    )
+    pool_metrics.listen(engine.sync_engine)
+    compiled_cache_stats.listen(engine.sync_engine)
+
+replicas = ReplicaSet(
+    [
+        replica_engine(url, replica_pool_metrics)
+        for url in settings.DATABASE_REPLICA_URLS
+    ],
+    settings.REPLICA_RETRY_SECONDS,
+)
+for replica in replicas.engines:
+    replica_pool_metrics.listen(replica)
+    compiled_cache_stats.listen(replica)
+
+# clients (by token, or address when anonymous) that wrote recently; their
+# reads go to the primary until replicas have caught up
+recent_writers = TTLCache(10_000, settings.READ_YOUR_WRITES_SECONDS)
+
+
+@asynccontextmanager
+async def session_scope(read_only: bool = False):
+    """Open a session; `read_only` sessions read from a replica."""
+    options = {'expire_on_commit': False}
+    session_class = Session
+    if read_only and replicas:
+        options['replicas'] = replicas
+        session_class = RoutingSession
+
+    if settings.DATABASE_MODE == 'sync':
+        session = ThreadedSession(session_class(engine, **options))
+        try:
+            yield session
+        finally:
+            await session.close()
+        return
+
+    async with AsyncSession(
+        engine, sync_session_class=session_class, **options
+    ) as session:
+        yield session
+
 
-from fast_api.settings import Settings
+def get_session_factory():
+    """Dependency for code that must open its own sessions, e.g. response
+    bodies streamed after the request's dependencies have been closed."""
+    return session_scope
 
-engine = create_engine(Settings().DATABASE_URL, echo=False)
 
+async def get_session(
+    request: Request, session_factory=Depends(get_session_factory)
+):
+    """The request's session. GET and HEAD requests, including their auth
+    lookup, read from a replica unless the same client wrote within
+    READ_YOUR_WRITES_SECONDS; everything else uses the primary."""
+    read_only = request.method in READ_METHODS
+    if replicas:
+        client = request.headers.get('authorization') or (
+            request.client.host if request.client else None
+        )
+        if not read_only:
+            recent_writers.set(client, True)
+        elif recent_writers.get(client):
+            read_only = False
 
-def get_session():  # pragma: no cover
-    with Session(engine) as session:
+    async with session_factory(read_only=read_only) as session:
         yield session
@@ -0,0 +1,81 @@
+import hashlib
+from http import HTTPStatus
+
+from fastapi import Request, Response
+
+from fast_api.models import Todo, register_ddl
+
+# todo_versions.version goes up on every insert, update or delete in todos,
+# whatever the write path (ORM, bulk statements, cascades), so it is an
+# exact validator for a user's todo list that costs one primary key lookup.
+SQLITE_DDL = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS todo_versions_{name} AFTER {event_} ON todos
+    BEGIN
+        INSERT INTO todo_versions (user_id, version) VALUES ({row}.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+    END
+    """
+    for name, event_, row in (
+        ('ai', 'INSERT', 'new'),
+        ('au', 'UPDATE', 'new'),
+        ('ad', 'DELETE', 'old'),
+    )
+]
+
+# Postgres bumps once per statement using transition tables, so a bulk
+# UPDATE of 500 todos is a single upsert rather than 500.
+POSTGRES_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION bump_todo_versions() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO todo_versions (user_id, version)
+        SELECT DISTINCT user_id, 1 FROM changed_rows
+        ON CONFLICT (user_id)
+        DO UPDATE SET version = todo_versions.version + 1;
+        RETURN NULL;
+    END
+    $$
+    """,
+    *(
+        f"""
+        CREATE TRIGGER todo_versions_{name} AFTER {event_} ON todos
+        REFERENCING {table} TABLE AS changed_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_todo_versions()
+        """
+        for name, event_, table in (
+            ('ai', 'INSERT', 'NEW'),
+            ('au', 'UPDATE', 'NEW'),
+            ('ad', 'DELETE', 'OLD'),
+        )
+    ),
+]
+
+register_ddl(Todo.__table__, sqlite=SQLITE_DDL, postgresql=POSTGRES_DDL)
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12)
+    return f'W/"{digest.hexdigest()}"'
+
+
+def not_modified(
+    request: Request, etag: str, headers: dict[str, str] | None = None
+) -> Response | None:
+    """Return a 304 response if the request's If-None-Match matches `etag`.
+
+    Validators are compared weakly (RFC 9110 §13.1.2): the W/ prefix is
+    ignored on both sides.
+    """
+    header = request.headers.get('if-none-match')
+    if not header:
+        return None
+
+    candidates = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    if '*' in candidates or etag.removeprefix('W/') in candidates:
+        return Response(
+            status_code=HTTPStatus.NOT_MODIFIED,
+            headers={**(headers or {}), 'ETag': etag},
+        )
+    return None
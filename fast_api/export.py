@@ -0,0 +1,66 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import select
+
+from fast_api.models import Todo
+
+EXPORT_COLUMNS = (
+    Todo.id,
+    Todo.title,
+    Todo.description,
+    Todo.state,
+    Todo.created_at,
+    Todo.updated_at,
+)
+FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+
+def plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def encode_ndjson(rows) -> str:
+    return ''.join(
+        json.dumps(dict(zip(FIELDS, map(plain, row))), ensure_ascii=False)
+        + '\n'
+        for row in rows
+    )
+
+
+def encode_csv(rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(FIELDS)
+    writer.writerows([plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def stream_todos(session_factory, user_id: int, fmt: str, chunk: int):
+    """Yield a user's todos encoded as `fmt`, one chunk of rows at a time.
+
+    Rows come from a server-side cursor in `chunk`-sized partitions and are
+    plain tuples rather than ORM objects, so memory stays flat no matter
+    how many todos the user has.
+    """
+    if fmt == 'csv':
+        yield encode_csv([], header=True)
+
+    query = (
+        select(*EXPORT_COLUMNS)
+        .where(Todo.user_id == user_id)
+        .order_by(Todo.id)
+        .execution_options(yield_per=chunk)
+    )
+    async with session_factory(read_only=True) as session:
+        result = await session.stream(query)
+        async for rows in result.partitions(chunk):
+            yield encode_csv(rows) if fmt == 'csv' else encode_ndjson(rows)
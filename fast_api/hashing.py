@@ -0,0 +1,131 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import Counter, Gauge
+from pwdlib import PasswordHash
+
+# Kept free of app imports: pool workers import this module to unpickle
+# the hashing functions, and should not build engines or read settings.
+pwd_context = PasswordHash.recommended()
+
+PENDING = Gauge(
+    'password_hashing_pending',
+    'Password hashing calls waiting or running.',
+    multiprocess_mode='livesum',
+)
+QUEUE_DEPTH = Gauge(
+    'password_hashing_queue_depth',
+    'Password hashing calls waiting for a free worker process.',
+    multiprocess_mode='livesum',
+)
+CALLS = Counter(
+    'password_hashing_calls_total',
+    'Password hashing calls by outcome (completed, failed, rejected).',
+    ['outcome'],
+)
+
+
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class HashingPool:
+    """Runs Argon2 in worker processes so it can't hold the GIL of a worker
+    that is serving requests.
+
+    `workers` processes hash in parallel; up to `max_pending` calls may be
+    waiting or running at once, after which callers get a 503 instead of
+    queueing without bound. With `workers=0` hashing falls back to the
+    threadpool. The load is exported to /metrics as password_hashing_*.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # forking a process that already runs event loop and driver
+            # threads is unsafe, so workers come from a clean forkserver
+            methods = multiprocessing.get_all_start_methods()
+            method = 'forkserver' if 'forkserver' in methods else 'spawn'
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(method),
+            )
+        return self._executor
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            CALLS.labels('rejected').inc()
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail='Server busy, try again later.',
+                headers={'Retry-After': '1'},
+            )
+
+        self._set_pending(self.pending + 1)
+        try:
+            if self.workers <= 0:
+                result = await run_in_threadpool(func, *args)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self.executor, func, *args)
+        except BaseException:
+            self.failed += 1
+            CALLS.labels('failed').inc()
+            raise
+        finally:
+            self._set_pending(self.pending - 1)
+        self.completed += 1
+        CALLS.labels('completed').inc()
+        return result
+
+    def _set_pending(self, pending: int) -> None:
+        self.pending = pending
+        PENDING.set(pending)
+        QUEUE_DEPTH.set(self.queue_depth)
+
+    @property
+    def queue_depth(self) -> int:
+        # calls beyond the worker count wait in the executor's queue
+        if self.workers <= 0:
+            return 0
+        return max(0, self.pending - self.workers)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'workers': self.workers,
+            'pending': self.pending,
+            'queue_depth': self.queue_depth,
+            'max_pending': self.max_pending,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+        }
+
+    def shutdown(self, wait: bool = False) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
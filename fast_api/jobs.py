@@ -0,0 +1,218 @@
+"""Background jobs run on the event loop of each worker.
+
+The lifespan starts a JobRunner that, every JOBS_INTERVAL_SECONDS, runs
+the deferred cleanups that don't belong in a request: archiving old
+trash, purging the data of deleted users and dropping expired revoked
+tokens and todo tombstones. Every job works in batches of JOBS_BATCH_SIZE
+rows, one committed transaction each, so locks are short and the WAL
+grows by one batch at a time; between batches it pauses, for longer
+while the request traffic is using the whole connection pool.
+
+Jobs only delete rows matching their criteria, so several workers
+running them at once just repeat some scans.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from functools import partial
+
+from sqlalchemy import delete, select
+from sqlalchemy.pool import Pool, QueuePool
+
+from fast_api.archive import archive_trash
+from fast_api.models import (
+    ArchivedTodo,
+    RevokedToken,
+    Todo,
+    TodoCounter,
+    TodoTombstone,
+    TodoVersion,
+    User,
+)
+from fast_api.revocation import utcnow
+from fast_api.settings import get_settings
+
+settings = get_settings()
+logger = logging.getLogger('uvicorn.error')
+
+# at most this many extra pauses per batch while the pool stays busy
+MAX_BACKOFF = 10
+
+Job = Callable[..., Awaitable[int]]
+
+
+def pool_busy(pool: Pool) -> bool:
+    return isinstance(pool, QueuePool) and pool.checkedout() >= pool.size()
+
+
+def throttle_for(pool: Pool, pause: float):
+    """Pause between batches, leaving the pool to requests while they use
+    all of it."""
+
+    async def throttle():
+        await asyncio.sleep(pause)
+        for _ in range(MAX_BACKOFF):
+            if not pool_busy(pool):
+                return
+            await asyncio.sleep(pause)
+
+    return throttle
+
+
+async def delete_in_batches(
+    session, model, criteria, batch_size: int, throttle=None
+) -> int:
+    """DELETE the `model` rows matching `criteria`, `batch_size` per
+    transaction. Returns how many were deleted."""
+    batch = (
+        select(model.id).where(criteria).limit(batch_size).scalar_subquery()
+    )
+    deleted = 0
+    while True:
+        result = await session.execute(
+            delete(model)
+            .where(model.id.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+        if throttle:
+            await throttle()
+
+
+async def purge_deleted_users(session, batch_size: int, throttle=None) -> int:
+    """Delete up to `batch_size` deleted users and everything they own."""
+    user_ids = (
+        await session.scalars(
+            select(User.id)
+            .where(User.deleted_at.is_not(None))
+            .order_by(User.id)
+            .limit(batch_size)
+        )
+    ).all()
+    if not user_ids:
+        return 0
+
+    purged = 0
+    # deleting todos writes tombstones, so they go after them
+    for model in (Todo, TodoTombstone, ArchivedTodo, RevokedToken):
+        purged += await delete_in_batches(
+            session, model, model.user_id.in_(user_ids), batch_size, throttle
+        )
+    # a handful of rows per user, written by the todos triggers
+    for model in (TodoCounter, TodoVersion):
+        await session.execute(delete(model).where(model.user_id.in_(user_ids)))
+    result = await session.execute(
+        delete(User)
+        .where(User.id.in_(user_ids))
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return purged + result.rowcount
+
+
+async def purge_revoked_tokens(session, batch_size: int, throttle=None) -> int:
+    """Expired tokens fail their signature check anyway."""
+    return await delete_in_batches(
+        session,
+        RevokedToken,
+        RevokedToken.expires_at <= utcnow(),
+        batch_size,
+        throttle,
+    )
+
+
+async def purge_tombstones(
+    session, older_than: timedelta, batch_size: int, throttle=None
+) -> int:
+    """GET /todos/changes turns away tokens older than the tombstones."""
+    return await delete_in_batches(
+        session,
+        TodoTombstone,
+        TodoTombstone.deleted_at < utcnow() - older_than,
+        batch_size,
+        throttle,
+    )
+
+
+def default_jobs(throttle) -> dict[str, Job]:
+    batch_size = settings.JOBS_BATCH_SIZE
+    return {
+        'archive_trash': partial(
+            archive_trash,
+            older_than=timedelta(days=settings.TODO_ARCHIVE_AFTER_DAYS),
+            batch_size=batch_size,
+            throttle=throttle,
+        ),
+        'purge_deleted_users': partial(
+            purge_deleted_users, batch_size=batch_size, throttle=throttle
+        ),
+        'purge_revoked_tokens': partial(
+            purge_revoked_tokens, batch_size=batch_size, throttle=throttle
+        ),
+        'purge_tombstones': partial(
+            purge_tombstones,
+            older_than=timedelta(days=settings.TODO_CHANGES_RETENTION_DAYS),
+            batch_size=batch_size,
+            throttle=throttle,
+        ),
+    }
+
+
+class JobRunner:
+    """Runs `jobs` one after the other every `interval` seconds, each with
+    a session of its own. A job that fails, whatever the error, is logged
+    and retried on the next round."""
+
+    def __init__(self, session_factory, jobs: dict[str, Job], interval: float):
+        self.session_factory = session_factory
+        self.jobs = jobs
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+
+    async def run(self) -> None:
+        # the first round waits too, so it doesn't compete with startup
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+
+    async def run_once(self) -> dict[str, int | None]:
+        """Run every job once; return rows affected by each, None if it
+        failed."""
+        results = {}
+        for name, job in self.jobs.items():
+            start = time.perf_counter()
+            try:
+                async with self.session_factory() as session:
+                    results[name] = await job(session)
+            except Exception:
+                # a failing job must not end the runner's task
+                logger.exception('job %s failed', name)
+                results[name] = None
+                continue
+            if results[name]:
+                logger.info(
+                    'job %s: %d rows in %.3fs',
+                    name,
+                    results[name],
+                    time.perf_counter() - start,
+                )
+        return results
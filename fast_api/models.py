@@ -1,12 +1,31 @@
+from collections.abc import Iterable
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import DDL, ForeignKey, Index, Table, event, func, text
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
 
 
+def register_ddl(
+    table: Table,
+    sqlite: Iterable[str] = (),
+    postgresql: Iterable[str] = (),
+    when: str = 'after_create',
+) -> None:
+    """Run raw DDL (triggers, virtual tables, extension indexes) on the
+    `when` event of `table`, each statement only on its own dialect."""
+    for dialect, statements in (
+        ('sqlite', sqlite),
+        ('postgresql', postgresql),
+    ):
+        for statement in statements:
+            event.listen(
+                table, when, DDL(statement).execute_if(dialect=dialect)
+            )
+
+
 class TodoState(str, Enum):
     draft = 'draft'
     todo = 'todo'
@@ -29,6 +48,10 @@ class User:
     updated_at: Mapped[datetime] = mapped_column(
         init=False, onupdate=func.now(), nullable=True
     )
+    # set by DELETE /users/{id}; the user's data is purged in background
+    deleted_at: Mapped[datetime] = mapped_column(
+        init=False, nullable=True, index=True
+    )
     todos: Mapped[list['Todo']] = relationship(
         init=False, back_populates='user', cascade='all, delete-orphan'
     )
@@ -37,6 +60,33 @@ class User:
 @table_registry.mapped_as_dataclass
 class Todo:
     __tablename__ = 'todos'
+    __table_args__ = (
+        # list_todos: WHERE user_id = ? ORDER BY id (and the keyset cursor);
+        # on Postgres it also covers the listed columns for index-only scans
+        Index(
+            'ix_todos_user_id_id',
+            'user_id',
+            'id',
+            postgresql_include=[
+                'title',
+                'description',
+                'state',
+                'created_at',
+                'updated_at',
+            ],
+        ),
+        # list_todos filtered by state, patch_todo and delete_todo
+        Index('ix_todos_user_id_state_id', 'user_id', 'state', 'id'),
+        # GET /todos/changes: WHERE user_id = ? AND updated_at >= ?
+        Index('ix_todos_user_id_updated_at', 'user_id', 'updated_at'),
+        # the archiving job, which only looks at trash
+        Index(
+            'ix_todos_trash_id',
+            'id',
+            sqlite_where=text("state = 'trash'"),
+            postgresql_where=text("state = 'trash'"),
+        ),
+    )
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     title: Mapped[str]
     description: Mapped[str]
@@ -45,7 +95,91 @@ class Todo:
     created_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now()
     )
+    # set on every write, so it is the watermark for GET /todos/changes
     updated_at: Mapped[datetime] = mapped_column(
-        init=False, onupdate=func.now(), nullable=True
+        init=False,
+        insert_default=func.now(),
+        onupdate=func.now(),
+        nullable=True,
     )
     user: Mapped[User] = relationship(init=False, back_populates='todos')
+
+
+@table_registry.mapped_as_dataclass
+class ArchivedTodo:
+    """A todo moved out of todos after staying in trash long enough."""
+
+    __tablename__ = 'todos_archive'
+    __table_args__ = (Index('ix_todos_archive_user_id_id', 'user_id', 'id'),)
+    id: Mapped[int] = mapped_column(init=False, primary_key=True)
+    title: Mapped[str]
+    description: Mapped[str]
+    state: Mapped[TodoState]
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
+    created_at: Mapped[datetime]
+    updated_at: Mapped[datetime] = mapped_column(nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoTombstone:
+    """A deleted todo, recorded by a trigger on todos for GET
+    /todos/changes."""
+
+    __tablename__ = 'todo_tombstones'
+    __table_args__ = (
+        Index(
+            'ix_todo_tombstones_user_id_deleted_at', 'user_id', 'deleted_at'
+        ),
+    )
+    id: Mapped[int] = mapped_column(init=False, primary_key=True)
+    todo_id: Mapped[int]
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
+    deleted_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoVersion:
+    """Per-user counter bumped by triggers on every write to todos."""
+
+    __tablename__ = 'todo_versions'
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    version: Mapped[int] = mapped_column(default=0)
+
+
+@table_registry.mapped_as_dataclass
+class TodoCounter:
+    """Number of todos per user and state, maintained by triggers."""
+
+    __tablename__ = 'todo_counters'
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    state: Mapped[TodoState] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0)
+
+
+@table_registry.mapped_as_dataclass
+class RevokedToken:
+    """A token id (`jti`) that must no longer be accepted."""
+
+    __tablename__ = 'revoked_tokens'
+    id: Mapped[int] = mapped_column(init=False, primary_key=True)
+    jti: Mapped[str] = mapped_column(unique=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
+    expires_at: Mapped[datetime]
+    revoked_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now(), index=True
+    )
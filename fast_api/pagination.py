@@ -0,0 +1,84 @@
+import base64
+import binascii
+import json
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+
+from fast_api.settings import get_settings
+
+settings = get_settings()
+
+# ids are BIGINT at most; anything wider would overflow in the driver
+MAX_ID = 2**63 - 1
+
+
+def encode_cursor(last_id: int) -> str:
+    payload = json.dumps({'id': last_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))['id']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        last_id = None
+
+    if (
+        not isinstance(last_id, int)
+        or isinstance(last_id, bool)
+        or not -MAX_ID - 1 <= last_id <= MAX_ID
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor.'
+        )
+    return last_id
+
+
+def paginate(query, id_column, cursor: str | None, limit: int | None):
+    """Apply keyset pagination on `id_column` to `query`.
+
+    Rows are always returned in id order. When a limit is given one extra
+    row is requested so the caller can tell if there is a next page; use
+    `split_page` on the result.
+    """
+    query = query.order_by(id_column)
+    if cursor:
+        query = query.where(id_column > decode_cursor(cursor))
+    if limit is not None:
+        # a zero or negative limit is an empty page, as before pagination
+        query = query.limit(max(limit, 0) + 1)
+    return query
+
+
+def split_page(rows, limit: int | None):
+    rows = list(rows)
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[: max(limit, 0)]
+    if not rows:
+        return rows, None
+    return rows, encode_cursor(rows[-1].id)
+
+
+def page_response(
+    key: str,
+    rows,
+    next_cursor: str | None,
+    headers: dict[str, str] | None = None,
+):
+    """Build a `{key: [...], 'next_cursor': ...}` list body from Core rows.
+
+    Rows selected with exactly the public schema's columns already have its
+    shape and types, so with FAST_LIST_RESPONSES they are encoded by orjson
+    as they are instead of being validated into models and dumped back out.
+    Otherwise the dict goes through the route's `response_model` as usual.
+    """
+    if not settings.FAST_LIST_RESPONSES:
+        return {key: rows, 'next_cursor': next_cursor}
+    return ORJSONResponse(
+        {key: [row._asdict() for row in rows], 'next_cursor': next_cursor},
+        headers=headers,
+    )
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class PoolMetrics:
+    """Connection pool counters fed by SQLAlchemy pool events.
+
+    Checkout wait time is measured around `Pool.connect()`, which covers
+    waiting for a free slot, opening overflow connections and pre-ping.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def listen(self, pool_target) -> None:
+        """Count connects, checkouts, checkins and invalidations."""
+
+        @event.listens_for(pool_target, 'connect')
+        def on_connect(dbapi_connection, connection_record):
+            self.connects += 1
+
+        @event.listens_for(pool_target, 'checkout')
+        def on_checkout(dbapi_connection, connection_record, proxy):
+            self.checkouts += 1
+
+        @event.listens_for(pool_target, 'checkin')
+        def on_checkin(dbapi_connection, connection_record):
+            self.checkins += 1
+
+        @event.listens_for(pool_target, 'invalidate')
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            self.invalidations += 1
+
+    def snapshot(self, pool: Pool) -> dict:
+        sized = isinstance(pool, QueuePool)
+        with self._lock:
+            wait_count, wait_total = self.wait_count, self.wait_total
+            wait_max = self.wait_max
+        return {
+            'pool_class': type(pool).__name__,
+            'size': pool.size() if sized else None,
+            'checked_out': pool.checkedout() if sized else None,
+            # SQLAlchemy reports unused pool slots as negative overflow
+            'overflow': max(0, pool.overflow()) if sized else None,
+            'connects': self.connects,
+            'checkouts': self.checkouts,
+            'checkins': self.checkins,
+            'invalidations': self.invalidations,
+            'timeouts': self.timeouts,
+            'wait_count': wait_count,
+            'wait_avg_ms': wait_total / wait_count * 1000 if wait_count else 0,
+            'wait_max_ms': wait_max * 1000,
+        }
+
+
+class TimedConnectMixin:
+    metrics: PoolMetrics
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.metrics.record_wait(0, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+def instrumented_pool_class(is_async: bool, metrics: PoolMetrics):
+    """QueuePool subclass that reports checkout wait to `metrics`.
+
+    The metrics live on the class so they survive `Pool.recreate()`.
+    """
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    return type(
+        f'Timed{base.__name__}',
+        (TimedConnectMixin, base),
+        {'metrics': metrics},
+    )
@@ -0,0 +1,124 @@
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from http import HTTPStatus
+
+from fastapi import Depends, HTTPException, Request
+
+from fast_api.models import User
+from fast_api.security import get_current_user
+from fast_api.settings import get_settings
+
+settings = get_settings()
+
+
+class RateLimiter:
+    """Token buckets refilled at `rate` per second, holding up to `burst`.
+
+    Each active key costs one (tokens, last_seen) entry. A bucket left idle
+    long enough to refill completely is indistinguishable from a new one,
+    so such entries are evicted as requests come in. Buckets are local to
+    the worker process, so with N workers a key gets up to N times `rate`.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.idle_seconds = burst / rate if rate > 0 else 0
+        self._buckets: OrderedDict[Hashable, tuple[float, float]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, key: Hashable) -> float:
+        """Take one token for `key`; return 0, or the seconds to wait."""
+        if self.rate <= 0:
+            return 0.0
+
+        now = self.clock()
+        self.evict_idle(now)
+        tokens, last_seen = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last_seen) * self.rate)
+
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate
+        self._buckets[key] = (tokens - 1, now)
+        return 0.0
+
+    def evict_idle(self, now: float) -> None:
+        # entries are kept in last-seen order, so the idle ones are first
+        while self._buckets:
+            _, last_seen = next(iter(self._buckets.values()))
+            if now - last_seen < self.idle_seconds:
+                break
+            self._buckets.popitem(last=False)
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+limiters: dict[str, RateLimiter] = {}
+
+
+def get_limiter(name: str) -> RateLimiter:
+    """The limiter configured by RATE_LIMIT_<NAME>_PER_SECOND/_BURST."""
+    if name not in limiters:
+        limiters[name] = RateLimiter(
+            getattr(settings, f'RATE_LIMIT_{name.upper()}_PER_SECOND'),
+            getattr(settings, f'RATE_LIMIT_{name.upper()}_BURST'),
+        )
+    return limiters[name]
+
+
+def check(limiter: RateLimiter, key: Hashable) -> None:
+    wait = limiter.acquire(key)
+    if wait:
+        raise HTTPException(
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            detail='Too many requests.',
+            headers={'Retry-After': str(math.ceil(wait))},
+        )
+
+
+def client_address(request: Request) -> str | None:
+    """The client's IP, as seen by the outermost of
+    RATE_LIMIT_TRUSTED_PROXIES proxies when there are any."""
+    hops = settings.RATE_LIMIT_TRUSTED_PROXIES
+    if hops > 0:
+        # each proxy appends the address it got the request from, so the
+        # ones left of the trusted hops may have been sent by the client
+        header = request.headers.get('x-forwarded-for', '')
+        forwarded = [a.strip() for a in header.split(',') if a.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.client.host if request.client else None
+
+
+def limit_by_ip(name: str):
+    """Router dependency limiting each client address."""
+    limiter = get_limiter(name)
+
+    async def dependency(request: Request):
+        check(limiter, client_address(request))
+
+    return Depends(dependency)
+
+
+def limit_by_user(name: str):
+    """Router dependency limiting each authenticated user."""
+    limiter = get_limiter(name)
+
+    async def dependency(current_user: User = Depends(get_current_user)):
+        check(limiter, current_user.id)
+
+    return Depends(dependency)
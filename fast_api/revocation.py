@@ -0,0 +1,79 @@
+"""Revoked token ids, mirrored in memory by every worker.
+
+The revoked_tokens table is the source of truth. Each worker keeps the ids
+that have not expired yet in a dict and, at most every
+REVOCATION_REFRESH_SECONDS, reads only the rows revoked since its previous
+refresh; in between, checking a token is a dict lookup.
+"""
+
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import select
+
+from fast_api.models import RevokedToken
+
+# rows are read again from a little before the newest revoked_at seen, so a
+# revocation whose transaction committed late is not skipped
+OVERLAP = timedelta(seconds=30)
+
+
+def utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+class DenyList:
+    def __init__(
+        self,
+        refresh_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self._expires: dict[str, datetime] = {}
+        self._watermark: datetime | None = None
+        self._refreshed_at: float | None = None
+
+    def __contains__(self, jti: str | None) -> bool:
+        return jti in self._expires
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        self._expires[jti] = expires_at
+
+    def is_stale(self) -> bool:
+        return (
+            self._refreshed_at is None
+            or self.clock() - self._refreshed_at >= self.refresh_seconds
+        )
+
+    async def refresh(self, session) -> None:
+        # marked before awaiting so concurrent requests don't all refresh
+        self._refreshed_at = self.clock()
+        now = utcnow()
+
+        query = select(
+            RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at
+        ).where(RevokedToken.expires_at > now)
+        if self._watermark is not None:
+            query = query.where(
+                RevokedToken.revoked_at >= self._watermark - OVERLAP
+            )
+        for jti, expires_at, revoked_at in await session.execute(query):
+            self._expires[jti] = expires_at
+            if self._watermark is None or revoked_at > self._watermark:
+                self._watermark = revoked_at
+
+        # expired tokens are rejected by their signature check anyway
+        self._expires = {
+            jti: expires_at
+            for jti, expires_at in self._expires.items()
+            if expires_at > now
+        }
+
+    def clear(self) -> None:
+        self._expires.clear()
+        self._watermark = self._refreshed_at = None
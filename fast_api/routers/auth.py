@@ -3,33 +3,41 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from fast_api.database import get_session
 from fast_api.models import User
-from fast_api.schemas import Token
+from fast_api.ratelimit import limit_by_ip, limit_by_user
+from fast_api.schemas import Message, Token
 from fast_api.security import (
     create_access_token,
     get_current_user,
-    verify_password,
+    oauth2_scheme,
+    password_hasher,
+    revoke_token,
 )
+from fast_api.statements import USER_BY_EMAIL
 
 router = APIRouter(prefix='/auth', tags=['auth'])
-T_Session = Annotated[Session, Depends(get_session)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
 T_OAuthForm = Annotated[OAuth2PasswordRequestForm, Depends()]
 T_CurrentUser = Annotated[User, Depends(get_current_user)]
+T_Token = Annotated[str, Depends(oauth2_scheme)]
 
 
-@router.post('/token', response_model=Token)
-def login_for_access_token(
+@router.post(
+    '/token', response_model=Token, dependencies=[limit_by_ip('auth')]
+)
+async def login_for_access_token(
     session: T_Session,
     form_data: T_OAuthForm,
 ):
-    user: User | None = session.scalar(
-        select(User).where(User.email == form_data.username)
+    user: User | None = await session.scalar(
+        USER_BY_EMAIL, {'email': form_data.username}
     )
-    if not user or not verify_password(form_data.password, user.password):
+    if not user or not await password_hasher.verify(
+        form_data.password, user.password
+    ):
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail='Incorrect username or passwod',
@@ -38,7 +46,19 @@ def login_for_access_token(
     return {'access_token': accessToken, 'token_type': 'Bearer'}
 
 
-@router.post('/refresh_token', response_model=Token)
-def refresh_acess_token(user: T_CurrentUser):
+@router.post(
+    '/refresh_token',
+    response_model=Token,
+    dependencies=[limit_by_user('auth')],
+)
+async def refresh_acess_token(user: T_CurrentUser):
     new_access_token = create_access_token(data={'sub': user.email})
     return {'access_token': new_access_token, 'token_type': 'Bearer'}
+
+
+@router.post(
+    '/logout', response_model=Message, dependencies=[limit_by_user('auth')]
+)
+async def logout(session: T_Session, user: T_CurrentUser, token: T_Token):
+    await revoke_token(session, token, user.id)
+    return {'message': 'Logged out'}
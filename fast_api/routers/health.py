@@ -0,0 +1,42 @@
+import time
+from http import HTTPStatus
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from fast_api.database import (
+    compiled_cache_stats,
+    engine,
+    get_session_factory,
+    pool_metrics,
+    replicas,
+)
+from fast_api.schemas import DatabaseHealth
+
+router = APIRouter(prefix='/health', tags=['health'])
+T_SessionFactory = Annotated[object, Depends(get_session_factory)]
+
+
+@router.get('/db', response_model=DatabaseHealth)
+async def database_health(
+    session_factory: T_SessionFactory, response: Response
+):
+    start = time.perf_counter()
+    try:
+        # checks the primary; replicas are reported as last seen
+        async with session_factory() as session:
+            await session.execute(text('SELECT 1'))
+        status, latency_ms = 'ok', (time.perf_counter() - start) * 1000
+    except (SQLAlchemyError, OSError):
+        response.status_code = HTTPStatus.SERVICE_UNAVAILABLE
+        status, latency_ms = 'unavailable', None
+
+    return {
+        'status': status,
+        'latency_ms': latency_ms,
+        'pool': pool_metrics.snapshot(engine.pool),
+        'compiled_cache': compiled_cache_stats.snapshot(),
+        'replicas': replicas.status(),
+    }
@@ -1,50 +1,155 @@
+from datetime import timedelta
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fast_api.database import get_session
-from fast_api.models import Todo, TodoState, User
+from fast_api.archive import restore_archived
+from fast_api.changes import OVERLAP, decode_since, encode_since, latest
+from fast_api.database import get_session, get_session_factory
+from fast_api.etag import make_etag, not_modified
+from fast_api.export import stream_todos
+from fast_api.models import (
+    ArchivedTodo,
+    Todo,
+    TodoState,
+    TodoTombstone,
+    User,
+)
+from fast_api.pagination import page_response, paginate, split_page
+from fast_api.ratelimit import limit_by_user
+from fast_api.revocation import utcnow
 from fast_api.schemas import (
+    ArchivedTodoList,
+    BulkResult,
     Message,
+    TodoBulkUpdate,
+    TodoChanges,
     TodoList,
     TodoPublic,
     TodoSchema,
+    TodoStats,
     TodoUpdate,
 )
+from fast_api.search import search
 from fast_api.security import get_current_user
+from fast_api.settings import get_settings
+from fast_api.statements import (
+    TODO_OF_USER,
+    TODO_VERSION,
+    update_todo_of_user,
+)
+from fast_api.stats import todo_counts
 
-router = APIRouter(prefix='/todos', tags=['todos'])
+router = APIRouter(
+    prefix='/todos', tags=['todos'], dependencies=[limit_by_user('todo')]
+)
+settings = get_settings()
 
 T_Current_User = Annotated[User, Depends(get_current_user)]
-T_Session = Annotated[Session, Depends(get_session)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
+T_SessionFactory = Annotated[object, Depends(get_session_factory)]
+T_TodoBatch = Annotated[
+    list[TodoSchema],
+    Body(min_length=1, max_length=settings.TODO_BATCH_MAX_SIZE),
+]
+
+# exactly the fields of TodoPublic, for page_response
+PUBLIC_COLUMNS = (
+    Todo.id,
+    Todo.title,
+    Todo.description,
+    Todo.state,
+    Todo.user_id,
+    Todo.created_at,
+    Todo.updated_at,
+)
+ARCHIVED_COLUMNS = (
+    ArchivedTodo.id,
+    ArchivedTodo.title,
+    ArchivedTodo.description,
+    ArchivedTodo.state,
+    ArchivedTodo.user_id,
+    ArchivedTodo.created_at,
+    ArchivedTodo.updated_at,
+    ArchivedTodo.archived_at,
+)
 
 
 @router.post('/', response_model=TodoPublic, status_code=HTTPStatus.CREATED)
-def create_todo(
+async def create_todo(
     todo: TodoSchema,
     current_user: T_Current_User,
     session: T_Session,
 ):
-    db_todo = Todo(**todo.model_dump(), user_id=current_user.id)
-    session.add(db_todo)
-    session.commit()
+    # INSERT ... RETURNING brings back the server defaults, no refresh
+    db_todo = await session.scalar(
+        insert(Todo)
+        .values(**todo.model_dump(), user_id=current_user.id)
+        .returning(Todo)
+    )
+    await session.commit()
     return db_todo
 
 
+@router.post(
+    '/batch', response_model=list[TodoPublic], status_code=HTTPStatus.CREATED
+)
+async def create_todos(
+    todos: T_TodoBatch,
+    current_user: T_Current_User,
+    session: T_Session,
+):
+    # one multi-row INSERT ... RETURNING instead of a round trip per todo
+    db_todos = await session.scalars(
+        insert(Todo).returning(Todo, sort_by_parameter_order=True),
+        [{**todo.model_dump(), 'user_id': current_user.id} for todo in todos],
+    )
+    db_todos = db_todos.all()
+    await session.commit()
+    return db_todos
+
+
+async def todos_etag(session, user_id: int, request: Request) -> str:
+    # the query string tells filtered and paginated views apart
+    version = await session.scalar(TODO_VERSION, {'user_id': user_id})
+    return make_etag(user_id, version or 0, str(request.query_params))
+
+
 @router.get('/', response_model=TodoList)
-def list_todos(  # noqa
+async def list_todos(  # noqa
     session: T_Session,
     current_user: T_Current_User,
+    request: Request,
+    response: Response,
     title: str | None = None,
     description: str | None = None,
     state: Annotated[TodoState, Query()] = None,
     offset: int | None = None,
     limit: int | None = None,
+    cursor: str | None = None,
+    q: str | None = None,
 ):
-    query = select(Todo).where(Todo.user_id == current_user.id)
+    headers = {
+        'ETag': await todos_etag(session, current_user.id, request),
+        'Cache-Control': 'private, no-cache',
+    }
+    if cached := not_modified(request, headers['ETag'], headers):
+        return cached
+    response.headers.update(headers)
+
+    query = select(*PUBLIC_COLUMNS).where(Todo.user_id == current_user.id)
 
     if title:
         query = query.filter(Todo.title.contains(title))
@@ -55,20 +160,161 @@ def list_todos(  # noqa
     if state:
         query = query.filter(Todo.state == state)
 
-    todos = session.scalars(query.offset(offset).limit(limit)).all()
+    if q:
+        # ranked results are ordered by relevance, not id, so they can't be
+        # walked with a keyset cursor
+        if cursor:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail='Cursor pagination is not available with q.',
+            )
+        dialect = session.get_bind().dialect.name
+        query = search(query, q, dialect).offset(offset).limit(limit)
+        rows = (await session.execute(query)).all()
+        return page_response('todos', rows, None, headers)
+
+    query = paginate(query.offset(offset), Todo.id, cursor, limit)
+    rows, next_cursor = split_page(await session.execute(query), limit)
 
-    return {'todos': todos}
+    return page_response('todos', rows, next_cursor, headers)
+
+
+@router.get('/changes', response_model=TodoChanges)
+async def list_todo_changes(
+    session: T_Session,
+    current_user: T_Current_User,
+    since: str | None = None,
+):
+    """Todos created or updated, and ids of todos deleted, since the
+    `next_since` of a previous call; without `since`, every todo. Apply
+    `deleted` before `todos`."""
+    todos = (
+        select(*PUBLIC_COLUMNS)
+        .where(Todo.user_id == current_user.id)
+        .order_by(Todo.updated_at, Todo.id)
+    )
+    if not since:
+        rows = (await session.execute(todos)).all()
+        watermark = latest(None, *(row.updated_at for row in rows))
+        return {
+            'todos': rows,
+            'deleted': [],
+            'next_since': encode_since(watermark) if watermark else None,
+        }
+
+    watermark = decode_since(since)
+    retention = timedelta(days=settings.TODO_CHANGES_RETENTION_DAYS)
+    if watermark < utcnow() - retention:
+        raise HTTPException(
+            status_code=HTTPStatus.GONE,
+            detail='Sync token expired, sync again without since.',
+        )
+
+    start = watermark - OVERLAP
+    rows = (await session.execute(todos.where(Todo.updated_at >= start))).all()
+    tombstones = (
+        await session.execute(
+            select(TodoTombstone.todo_id, TodoTombstone.deleted_at).where(
+                TodoTombstone.user_id == current_user.id,
+                TodoTombstone.deleted_at >= start,
+            )
+        )
+    ).all()
+    watermark = latest(
+        watermark,
+        *(row.updated_at for row in rows),
+        *(tombstone.deleted_at for tombstone in tombstones),
+    )
+    return {
+        'todos': rows,
+        'deleted': sorted({tombstone.todo_id for tombstone in tombstones}),
+        'next_since': encode_since(watermark),
+    }
+
+
+@router.get('/stats', response_model=TodoStats)
+async def todo_stats(session: T_Session, current_user: T_Current_User):
+    counts = dict.fromkeys(TodoState, 0)
+    counts.update(await todo_counts(session, current_user.id))
+    return {'counts': counts, 'total': sum(counts.values())}
+
+
+@router.get('/archive', response_model=ArchivedTodoList)
+async def list_archived_todos(
+    session: T_Session,
+    current_user: T_Current_User,
+    limit: int | None = None,
+    cursor: str | None = None,
+):
+    # archived todos only show up here, never in the lists above
+    query = paginate(
+        select(*ARCHIVED_COLUMNS).where(
+            ArchivedTodo.user_id == current_user.id
+        ),
+        ArchivedTodo.id,
+        cursor,
+        limit,
+    )
+    rows, next_cursor = split_page(await session.execute(query), limit)
+    return page_response('todos', rows, next_cursor)
+
+
+@router.post('/archive/{archived_id}/restore', response_model=TodoPublic)
+async def restore_archived_todo(
+    archived_id: int, session: T_Session, current_user: T_Current_User
+):
+    todo = await restore_archived(session, current_user.id, archived_id)
+    if not todo:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Task not found.'
+        )
+
+    await session.commit()
+    return todo
+
+
+EXPORT_MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+@router.get('/export', response_class=StreamingResponse)
+async def export_todos(
+    current_user: T_Current_User,
+    session_factory: T_SessionFactory,
+    fmt: Annotated[Literal['ndjson', 'csv'], Query(alias='format')] = 'ndjson',
+):
+    # the request session is closed before the body is streamed, so rows
+    # are read through a session of their own
+    return StreamingResponse(
+        stream_todos(
+            session_factory,
+            current_user.id,
+            fmt,
+            settings.TODO_EXPORT_CHUNK_SIZE,
+        ),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="todos.{fmt}"'},
+    )
 
 
 @router.patch('/{todo_id}', response_model=TodoUpdate)
-def patch_todo(
+async def patch_todo(
     todo_id: int,
     session: T_Session,
     current_user: T_Current_User,
     todo: TodoUpdate,
 ):
-    db_todo = session.scalar(
-        select(Todo).where(Todo.user_id == current_user.id, Todo.id == todo_id)
+    # create_at is not a column, and updated_at is the sync watermark,
+    # managed by the database; nulls are dropped, the columns are NOT NULL
+    values = todo.model_dump(
+        exclude_unset=True,
+        exclude_none=True,
+        exclude={'create_at', 'updated_at'},
+    )
+    query = TODO_OF_USER
+    if values:
+        query = update_todo_of_user(frozenset(values))
+    db_todo = await session.scalar(
+        query, {**values, 'owner_id': current_user.id, 'todo_id': todo_id}
     )
 
     if not db_todo:
@@ -76,28 +322,88 @@ def patch_todo(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found.'
         )
 
-    for key, value in todo.model_dump(exclude_unset=True).items():
-        setattr(db_todo, key, value)
-
-    session.add(db_todo)  # essa linha não é obrigatoria.
-    session.commit()
-    session.refresh(db_todo)
+    await session.commit()
 
     return db_todo
 
 
 @router.delete('/{todo_id}', response_model=Message)
-def delete_todo(
+async def delete_todo(
     todo_id: int, session: T_Session, current_user: T_Current_User
 ):
-    todo = session.scalar(
-        select(Todo).where(Todo.user_id == current_user.id, Todo.id == todo_id)
+    todo = await session.scalar(
+        TODO_OF_USER, {'owner_id': current_user.id, 'todo_id': todo_id}
     )
     if not todo:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found.'
         )
 
-    session.delete(todo)
-    session.commit()
+    await session.delete(todo)
+    await session.commit()
     return {'message': 'Task has been deleted sucessfully'}
+
+
+def bulk_filter(user_id: int, ids: list[int] | None, state: TodoState | None):
+    # refuse to touch every todo of the user by accident
+    if not ids and not state:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Provide ids or state to select todos.',
+        )
+    if ids and len(ids) > settings.TODO_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Too many ids.'
+        )
+
+    criteria = [Todo.user_id == user_id]
+    if ids:
+        criteria.append(Todo.id.in_(ids))
+    if state:
+        criteria.append(Todo.state == state)
+    return criteria
+
+
+@router.patch('/', response_model=BulkResult)
+async def patch_todos(
+    bulk: TodoBulkUpdate,
+    session: T_Session,
+    current_user: T_Current_User,
+):
+    criteria = bulk_filter(current_user.id, bulk.ids, bulk.state)
+    # timestamps are managed by the database, and the columns are NOT NULL
+    values = bulk.update.model_dump(
+        exclude_unset=True,
+        exclude_none=True,
+        exclude={'create_at', 'updated_at'},
+    )
+    if not values:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Nothing to update.'
+        )
+
+    result = await session.execute(
+        update(Todo)
+        .where(*criteria)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return {'count': result.rowcount}
+
+
+@router.delete('/', response_model=BulkResult)
+async def delete_todos(
+    session: T_Session,
+    current_user: T_Current_User,
+    ids: Annotated[list[int] | None, Query()] = None,
+    state: Annotated[TodoState | None, Query()] = None,
+):
+    criteria = bulk_filter(current_user.id, ids, state)
+    result = await session.execute(
+        delete(Todo)
+        .where(*criteria)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return {'count': result.rowcount}
@@ -1,71 +1,104 @@
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from fast_api.database import get_session
+from fast_api.etag import make_etag, not_modified
 from fast_api.models import User
+from fast_api.pagination import page_response, paginate, split_page
+from fast_api.ratelimit import limit_by_ip
 from fast_api.schemas import Message, UserList, UserPublic, UserSchema
-from fast_api.security import get_current_user, get_password_hash
-
-router = APIRouter(prefix='/users', tags=['users'])
-T_Session = Annotated[Session, Depends(get_session)]
+from fast_api.security import (
+    get_current_user,
+    invalidate_cached_user,
+    password_hasher,
+)
+from fast_api.statements import USER_BY_ID
+
+router = APIRouter(
+    prefix='/users', tags=['users'], dependencies=[limit_by_ip('users')]
+)
+T_Session = Annotated[AsyncSession, Depends(get_session)]
 T_CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
+def duplicate_user_error(exc: IntegrityError) -> HTTPException:
+    # the unique constraints are the uniqueness check, so the violated
+    # column is read from the driver's message (sqlite names the column,
+    # postgres the users_<column>_key constraint)
+    message = str(exc.orig)
+    for column, detail in (
+        ('username', 'Username already exists.'),
+        ('email', 'Email already exists.'),
+    ):
+        if f'users.{column}' in message or f'users_{column}_key' in message:
+            return HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST, detail=detail
+            )
+    raise exc
+
+
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
-def create_user(user: UserSchema, session: T_Session):
-    db_user = session.scalar(
-        select(User).where(
-            (User.email == user.email) | (User.username == user.username)
+async def create_user(user: UserSchema, session: T_Session):
+    # a single INSERT ... RETURNING; duplicates are caught by the database
+    query = (
+        insert(User)
+        .values(
+            username=user.username,
+            email=user.email,
+            password=await password_hasher.hash(user.password),
         )
+        .returning(User)
     )
-    if db_user:
-        if db_user.username == user.username:
-            raise HTTPException(
-                status_code=HTTPStatus.BAD_REQUEST,
-                detail='Username already exists.',
-            )
-        if db_user.email == user.email:
-            raise HTTPException(
-                status_code=HTTPStatus.BAD_REQUEST,
-                detail='Email already exists.',
-            )
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        password=get_password_hash(user.password),
-    )
-    session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    try:
+        db_user = await session.scalar(query)
+        await session.commit()
+    except IntegrityError as exc:
+        await session.rollback()
+        raise duplicate_user_error(exc) from exc
     return db_user
 
 
 @router.get('/', status_code=HTTPStatus.OK, response_model=UserList)
-def list_users(
+async def list_users(
     session: T_Session,
     limit: int = 10,
     skip: int = 0,
+    cursor: str | None = None,
 ):
-    users = session.scalars(select(User).limit(limit).offset(skip))
-    return {'users': users}
+    query = (
+        select(User.id, User.username, User.email)
+        .where(User.deleted_at.is_(None))
+        .offset(skip)
+    )
+    query = paginate(query, User.id, cursor, limit)
+    users, next_cursor = split_page(await session.execute(query), limit)
+    return page_response('users', users, next_cursor)
 
 
 @router.get('/{user_id}', response_model=UserPublic)
-def read_user_by_id(user_id: int, session: T_Session):
-    user_db = session.scalar(select(User).where(User.id == user_id))
+async def read_user_by_id(
+    user_id: int, session: T_Session, request: Request, response: Response
+):
+    user_db = await session.scalar(USER_BY_ID, {'user_id': user_id})
     if not user_db:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found'
         )
+
+    etag = make_etag(user_db.id, user_db.username, user_db.email)
+    if cached := not_modified(request, etag):
+        return cached
+    response.headers['ETag'] = etag
     return user_db
 
 
 @router.put('/{user_id}', response_model=UserPublic)
-def update_user(
+async def update_user(
     user_id: int,
     user: UserSchema,
     session: T_Session,
@@ -75,24 +108,46 @@ def update_user(
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permission'
         )
-    current_user.username = user.username
-    current_user.email = user.email
-    current_user.password = get_password_hash(user.password)
-
-    session.commit()
-    session.refresh(current_user)
+    query = (
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            username=user.username,
+            email=user.email,
+            password=await password_hasher.hash(user.password),
+        )
+        .returning(User)
+    )
+    try:
+        db_user = await session.scalar(query)
+        await session.commit()
+    except IntegrityError as exc:
+        await session.rollback()
+        raise duplicate_user_error(exc) from exc
+    invalidate_cached_user(user_id)
 
-    return current_user
+    return db_user
 
 
 @router.delete('/{user_id}', response_model=Message)
-def delete_user(user_id: int, session: T_Session, current_user: T_CurrentUser):
+async def delete_user(
+    user_id: int, session: T_Session, current_user: T_CurrentUser
+):
     if user_id != current_user.id:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permission'
         )
 
-    session.delete(current_user)
-    session.commit()
+    # the row and its todos are purged later, in batches, by the jobs;
+    # the username and email are freed now. The .invalid domain is
+    # reserved and rejected by EmailStr, so the placeholder is unique.
+    placeholder = f'deleted-{user_id}@deleted.invalid'
+    await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(username=placeholder, email=placeholder, deleted_at=func.now())
+    )
+    await session.commit()
+    invalidate_cached_user(user_id)
 
     return {'message': 'User deleted'}
@@ -24,6 +24,7 @@ class UserPublic(BaseModel):
 
 class UserList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
 
 
 class Token(BaseModel):
@@ -46,6 +47,22 @@ class TodoPublic(TodoSchema):
 
 class TodoList(BaseModel):
     todos: list[TodoPublic | None]
+    next_cursor: str | None = None
+
+
+class TodoChanges(BaseModel):
+    todos: list[TodoPublic]
+    deleted: list[int]
+    next_since: str | None = None
+
+
+class ArchivedTodoPublic(TodoPublic):
+    archived_at: datetime
+
+
+class ArchivedTodoList(BaseModel):
+    todos: list[ArchivedTodoPublic]
+    next_cursor: str | None = None
 
 
 class TodoUpdate(BaseModel):
@@ -54,3 +71,55 @@ class TodoUpdate(BaseModel):
     state: TodoState | None = None
     create_at: datetime | None = None
     updated_at: datetime | None = None
+
+
+class TodoBulkUpdate(BaseModel):
+    ids: list[int] | None = None
+    state: TodoState | None = None
+    update: TodoUpdate
+
+
+class BulkResult(BaseModel):
+    count: int
+
+
+class TodoStats(BaseModel):
+    counts: dict[TodoState, int]
+    total: int
+
+
+class PoolStatus(BaseModel):
+    pool_class: str
+    size: int | None
+    checked_out: int | None
+    overflow: int | None
+    connects: int
+    checkouts: int
+    checkins: int
+    invalidations: int
+    timeouts: int
+    wait_count: int
+    wait_avg_ms: float
+    wait_max_ms: float
+
+
+class ReplicaStatus(BaseModel):
+    url: str
+    healthy: bool
+
+
+class CompiledCacheStatus(BaseModel):
+    hit: int
+    miss: int
+    disabled: int
+    no_key: int
+    no_dialect_support: int
+    hit_ratio: float | None
+
+
+class DatabaseHealth(BaseModel):
+    status: str
+    latency_ms: float | None
+    pool: PoolStatus
+    compiled_cache: CompiledCacheStatus
+    replicas: list[ReplicaStatus] = []
@@ -0,0 +1,105 @@
+import re
+
+from sqlalchemy import func, literal, literal_column, or_, table
+from sqlalchemy.sql import column
+
+from fast_api.models import Todo, register_ddl
+
+# SQLite: external-content FTS5 index over todos, kept in sync by triggers.
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+        title, description, content='todos', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_ai AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_ad AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_au
+    AFTER UPDATE OF title, description ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+# Postgres: GIN over the same tsvector expression used by `search`, plus
+# trigram indexes so the `title`/`description` substring filters are
+# indexed as well.
+POSTGRES_DDL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """
+    CREATE INDEX IF NOT EXISTS ix_todos_search ON todos USING gin (
+        to_tsvector('simple', title || ' ' || description)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_todos_title_trgm ON todos
+    USING gin (title gin_trgm_ops)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_todos_description_trgm ON todos
+    USING gin (description gin_trgm_ops)
+    """,
+]
+
+register_ddl(Todo.__table__, sqlite=SQLITE_DDL, postgresql=POSTGRES_DDL)
+register_ddl(
+    Todo.__table__,
+    sqlite=['DROP TABLE IF EXISTS todos_fts'],
+    when='before_drop',
+)
+
+todos_fts = table('todos_fts', column('rowid'), column('rank'))
+
+# a NUL ends an FTS5 string early and Postgres text can't hold one
+CONTROL_CHARACTERS = re.compile(r'[\x00-\x1f\x7f]')
+
+
+def fts5_query(q: str) -> str:
+    # quote every term so user input can't reach the FTS5 query syntax,
+    # and prefix-match them so partial words still find results
+    terms = (term.replace('"', '""') for term in q.split())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search(query, q: str, dialect: str):
+    """Restrict a `select(Todo)` to rows matching `q`, best match first."""
+    q = CONTROL_CHARACTERS.sub(' ', q)
+    if not q.split():
+        return query
+
+    if dialect == 'sqlite':
+        return (
+            query.join(todos_fts, todos_fts.c.rowid == Todo.id)
+            .where(literal_column('todos_fts').op('MATCH')(fts5_query(q)))
+            .order_by(todos_fts.c.rank, Todo.id)
+        )
+
+    if dialect == 'postgresql':
+        # inlined, not bound, so the expression matches ix_todos_search
+        simple = literal_column("'simple'")
+        document = func.to_tsvector(
+            simple,
+            Todo.title + literal(' ', literal_execute=True) + Todo.description,
+        )
+        tsquery = func.websearch_to_tsquery(simple, q)
+        return query.where(document.op('@@')(tsquery)).order_by(
+            func.ts_rank(document, tsquery).desc(), Todo.id
+        )
+
+    return query.where(
+        or_(Todo.title.contains(q), Todo.description.contains(q))
+    ).order_by(Todo.id)
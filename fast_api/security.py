@@ -1,30 +1,35 @@
-from datetime import datetime, timedelta
+import time
+import uuid
+from datetime import UTC, datetime, timedelta
 from http import HTTPStatus
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt import PyJWTError, decode, encode
 from jwt.exceptions import ExpiredSignatureError
-from pwdlib import PasswordHash
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 from zoneinfo import ZoneInfo
 
-from fast_api.database import get_session
-from fast_api.models import User
-from fast_api.settings import Settings
+from fast_api.cache import TTLCache
+from fast_api.database import get_session, get_session_factory
+from fast_api.hashing import HashingPool
+from fast_api.models import RevokedToken, User
+from fast_api.revocation import DenyList
+from fast_api.settings import get_settings
+from fast_api.statements import USER_BY_EMAIL
 
-pwd_context = PasswordHash.recommended()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
-settings = Settings()
-
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+settings = get_settings()
+# token -> (jti, detached snapshot of its user), so authenticated requests
+# don't pay a users lookup each time. Local to the worker: other workers
+# only see an update/delete once their entry's TTL runs out.
+user_cache = TTLCache(
+    settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS, name='users'
+)
+password_hasher = HashingPool(settings.HASH_WORKERS, settings.HASH_MAX_PENDING)
+deny_list = DenyList(settings.REVOCATION_REFRESH_SECONDS)
 
 
 def create_access_token(data: dict):
@@ -32,22 +37,78 @@ def create_access_token(data: dict):
     expire = datetime.now(tz=ZoneInfo('UTC')) + timedelta(
         minutes=settings.ACESS_TOKEN_EXPIRE_MINUTES
     )
-    to_encode.update({'exp': expire})
+    to_encode.update({'exp': expire, 'jti': uuid.uuid4().hex})
     encoded_jwt = encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
     return encoded_jwt
 
 
-def get_current_user(
-    session: Session = Depends(get_session),
+def detached_copy(user: User) -> User:
+    copy = User(
+        username=user.username, email=user.email, password=user.password
+    )
+    copy.id = user.id
+    copy.created_at = user.created_at
+    copy.updated_at = user.updated_at
+    copy.deleted_at = user.deleted_at
+    make_transient_to_detached(copy)
+    return copy
+
+
+def invalidate_cached_user(user_id: int) -> None:
+    user_cache.discard_where(lambda entry: entry[1].id == user_id)
+
+
+async def revoke_token(session: AsyncSession, token: str, user_id: int):
+    payload = decode(
+        token, key=settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+    )
+    if 'jti' not in payload:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Token cannot be revoked.',
+        )
+
+    expires_at = datetime.fromtimestamp(payload['exp'], UTC)
+    expires_at = expires_at.replace(tzinfo=None)
+    session.add(
+        RevokedToken(
+            jti=payload['jti'], user_id=user_id, expires_at=expires_at
+        )
+    )
+    try:
+        await session.commit()
+    except IntegrityError:
+        # revoked meanwhile by another worker, whose deny list is ahead
+        await session.rollback()
+    deny_list.add(payload['jti'], expires_at)
+    user_cache.pop(token)
+
+
+async def get_current_user(
+    session: AsyncSession = Depends(get_session),
     token: str = Depends(oauth2_scheme),
+    session_factory=Depends(get_session_factory),
 ) -> User:
     credentials_exception = HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
         detail='Could not validade credentials',
         headers={'WWW-Authenticate': 'Bearer'},
     )
+    # at most one revoked_tokens query per refresh interval per worker,
+    # on the primary: a lagging replica would keep revoked tokens valid
+    if deny_list.is_stale():
+        async with session_factory() as primary:
+            await deny_list.refresh(primary)
+
+    cached = user_cache.get(token)
+    if cached is not None:
+        jti, cached_user = cached
+        if jti in deny_list:
+            raise credentials_exception
+        return await session.merge(cached_user, load=False)
+
     try:
         payload = decode(
             token, key=settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
@@ -60,9 +121,14 @@ def get_current_user(
     except PyJWTError:
         raise credentials_exception
 
-    user = session.scalar(select(User).where(User.email == username))
+    if payload.get('jti') in deny_list:
+        raise credentials_exception
+
+    user = await session.scalar(USER_BY_EMAIL, {'email': username})
 
     if not user:
         raise credentials_exception
 
+    ttl = payload['exp'] - time.time() if 'exp' in payload else None
+    user_cache.set(token, (payload.get('jti'), detached_copy(user)), ttl=ttl)
     return user
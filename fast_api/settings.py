@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -13,3 +16,72 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACESS_TOKEN_EXPIRE_MINUTES: int
+    # 'async' usa AsyncSession (aiosqlite/asyncpg); 'sync' roda a Session
+    # bloqueante no threadpool, para comparar throughput entre os dois modos
+    DATABASE_MODE: Literal['async', 'sync'] = 'async'
+    # cache do usuário autenticado por token (0 desliga o cache)
+    AUTH_CACHE_SIZE: int = 1024
+    AUTH_CACHE_TTL_SECONDS: float = 60
+    # intervalo máximo para um worker ver tokens revogados por outro
+    REVOCATION_REFRESH_SECONDS: float = 5
+    # processos dedicados ao Argon2 (0 usa o threadpool) e quantos hashes
+    # podem estar na fila antes de responder 503
+    HASH_WORKERS: int = 2
+    HASH_MAX_PENDING: int = 64
+    # máximo de itens aceitos por POST /todos/batch
+    TODO_BATCH_MAX_SIZE: int = 500
+    # linhas buscadas por vez no cursor do GET /todos/export
+    TODO_EXPORT_CHUNK_SIZE: int = 1000
+    # todos na lixeira há mais de TODO_ARCHIVE_AFTER_DAYS dias vão para
+    # todos_archive
+    TODO_ARCHIVE_AFTER_DAYS: float = 30
+    # por quanto tempo os todos apagados são lembrados para o
+    # GET /todos/changes; tokens mais antigos pedem uma sincronização
+    # completa
+    TODO_CHANGES_RETENTION_DAYS: float = 30
+    # listagens serializam as linhas direto com orjson, sem revalidar
+    FAST_LIST_RESPONSES: bool = True
+    # token buckets por router: requisições por segundo e rajada máxima
+    # (0 desliga o limite). Em todos e nas rotas autenticadas de auth a
+    # chave é o usuário; no login e em users é o IP do cliente, por isso
+    # esses vêm desligados: atrás de um proxy reverso ou ingress o IP visto
+    # é o do proxy e todos os clientes dividiriam o mesmo bucket. Para
+    # ligá-los nesse caso, RATE_LIMIT_TRUSTED_PROXIES diz quantos proxies
+    # confiáveis acrescentam ao X-Forwarded-For, e o IP é lido de lá
+    RATE_LIMIT_AUTH_PER_SECOND: float = 0
+    RATE_LIMIT_AUTH_BURST: int = 10
+    RATE_LIMIT_USERS_PER_SECOND: float = 0
+    RATE_LIMIT_USERS_BURST: int = 20
+    RATE_LIMIT_TRUSTED_PROXIES: int = 0
+    RATE_LIMIT_TODO_PER_SECOND: float = 20
+    RATE_LIMIT_TODO_BURST: int = 100
+    # réplicas de leitura: GET/HEAD leem de uma delas em round-robin; uma
+    # réplica que falha fica de fora por REPLICA_RETRY_SECONDS, e quem
+    # escreveu lê do primário por READ_YOUR_WRITES_SECONDS (0 desliga)
+    DATABASE_REPLICA_URLS: list[str] = []
+    REPLICA_RETRY_SECONDS: float = 30
+    READ_YOUR_WRITES_SECONDS: float = 5
+    # aquecimento no startup: conexões abertas antecipadamente no pool,
+    # um hash Argon2 e as consultas mais comuns já compiladas
+    WARMUP_ENABLED: bool = True
+    WARMUP_CONNECTIONS: int = 2
+    # tarefas em segundo plano (arquivar a lixeira, apagar os dados de
+    # usuários excluídos e tokens expirados), a cada JOBS_INTERVAL_SECONDS;
+    # cada lote de JOBS_BATCH_SIZE linhas é uma transação, com uma pausa
+    # entre lotes que se estende enquanto o pool estiver todo em uso
+    JOBS_ENABLED: bool = True
+    JOBS_INTERVAL_SECONDS: float = 300
+    JOBS_BATCH_SIZE: int = 500
+    JOBS_BATCH_PAUSE_SECONDS: float = 0.1
+    # pool de conexões (ignorado para sqlite em memória)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_RECYCLE: int = -1
+
+
+@lru_cache
+def get_settings() -> Settings:
+    # lido uma vez por processo, em vez de uma vez por módulo
+    return Settings()
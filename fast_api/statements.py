@@ -0,0 +1,93 @@
+"""Prebuilt statements for the lookups made on every request.
+
+Each statement is built once, with `bindparam()` placeholders, and executed
+with a dict of values. Building `select(...).where(...)` per call costs the
+construct itself plus a cache key traversal before the compiled cache can
+be consulted; a reused statement memoizes its cache key, so a request only
+pays the compiled cache lookup.
+"""
+
+import threading
+from functools import lru_cache
+
+from sqlalchemy import bindparam, event, select, update
+
+from fast_api.models import Todo, TodoVersion, User
+
+# deleted users are gone for the API as soon as they are marked
+USER_BY_EMAIL = select(User).where(
+    User.email == bindparam('email'), User.deleted_at.is_(None)
+)
+USER_BY_ID = select(User).where(
+    User.id == bindparam('user_id'), User.deleted_at.is_(None)
+)
+TODO_VERSION = select(TodoVersion.version).where(
+    TodoVersion.user_id == bindparam('user_id')
+)
+# bound names in the WHERE clause of an UPDATE can't match a column name
+TODO_OF_USER = select(Todo).where(
+    Todo.user_id == bindparam('owner_id'), Todo.id == bindparam('todo_id')
+)
+
+
+@lru_cache
+def update_todo_of_user(columns: frozenset[str]):
+    """UPDATE ... RETURNING for one todo, setting `columns`; one statement
+    per set of columns a PATCH can send."""
+    return (
+        update(Todo)
+        .where(
+            Todo.user_id == bindparam('owner_id'),
+            Todo.id == bindparam('todo_id'),
+        )
+        .values({column: bindparam(column) for column in sorted(columns)})
+        .returning(Todo)
+    )
+
+
+class CompiledCacheStats:
+    """Counts how each executed statement got its compiled SQL.
+
+    Fed by `after_cursor_execute`, so it covers every engine listened to,
+    sync or async: `hit` and `miss` are compiled cache lookups, `no_key`
+    statements can't be cached (e.g. DDL or textual SQL without a key).
+    """
+
+    RESULTS = {
+        'CACHE_HIT': 'hit',
+        'CACHE_MISS': 'miss',
+        'CACHING_DISABLED': 'disabled',
+        'NO_CACHE_KEY': 'no_key',
+        'NO_DIALECT_SUPPORT': 'no_dialect_support',
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(self.RESULTS.values(), 0)
+
+    def listen(self, engine) -> None:
+        event.listen(
+            engine, 'after_cursor_execute', self.on_execute, named=True
+        )
+
+    def on_execute(self, context, **kwargs):
+        # DDL and driver-level calls may run without an execution context
+        cache_hit = getattr(context, 'cache_hit', None)
+        if cache_hit is None:
+            return
+        result = self.RESULTS.get(cache_hit.name, 'no_key')
+        with self._lock:
+            self.counts[result] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = dict(self.counts)
+        lookups = counts['hit'] + counts['miss']
+        return {
+            **counts,
+            'hit_ratio': counts['hit'] / lookups if lookups else None,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts = dict.fromkeys(self.RESULTS.values(), 0)
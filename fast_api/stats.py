@@ -0,0 +1,135 @@
+"""Per-user todo counts by state.
+
+todo_counters is kept up to date by triggers on todos, inside the same
+transaction as the write that changes it, so GET /todos/stats never has
+to count rows. If the counters ever drift (manual SQL with triggers
+disabled, restored backups...), rebuild them with:
+
+    python -m fast_api.stats [--user-id ID]
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy import delete, func, insert, select, text
+
+from fast_api.database import session_scope
+from fast_api.models import Todo, TodoCounter, register_ddl
+
+SQLITE_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS todo_counters_ai AFTER INSERT ON todos
+    BEGIN
+        INSERT INTO todo_counters (user_id, state, count)
+        VALUES (new.user_id, new.state, 1)
+        ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todo_counters_ad AFTER DELETE ON todos
+    BEGIN
+        UPDATE todo_counters SET count = count - 1
+        WHERE user_id = old.user_id AND state = old.state;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todo_counters_au
+    AFTER UPDATE OF user_id, state ON todos
+    BEGIN
+        UPDATE todo_counters SET count = count - 1
+        WHERE user_id = old.user_id AND state = old.state;
+        INSERT INTO todo_counters (user_id, state, count)
+        VALUES (new.user_id, new.state, 1)
+        ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1;
+    END
+    """,
+]
+
+# Postgres applies one grouped delta per statement from the transition
+# tables, so bulk writes cost one upsert per (user, state) touched.
+POSTGRES_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION count_todos() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE todo_counters AS c SET count = c.count - d.n
+            FROM (
+                SELECT user_id, state, count(*) AS n
+                FROM old_rows GROUP BY user_id, state
+            ) AS d
+            WHERE c.user_id = d.user_id AND c.state = d.state;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO todo_counters (user_id, state, count)
+            SELECT user_id, state, count(*)
+            FROM new_rows GROUP BY user_id, state
+            ON CONFLICT (user_id, state)
+            DO UPDATE SET count = todo_counters.count + excluded.count;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER todo_counters_ai AFTER INSERT ON todos
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_todos()
+    """,
+    """
+    CREATE TRIGGER todo_counters_au AFTER UPDATE ON todos
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_todos()
+    """,
+    """
+    CREATE TRIGGER todo_counters_ad AFTER DELETE ON todos
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_todos()
+    """,
+]
+
+register_ddl(Todo.__table__, sqlite=SQLITE_DDL, postgresql=POSTGRES_DDL)
+
+
+async def todo_counts(session, user_id: int) -> dict:
+    rows = await session.execute(
+        select(TodoCounter.state, TodoCounter.count).where(
+            TodoCounter.user_id == user_id
+        )
+    )
+    return dict(rows.all())
+
+
+async def rebuild_counters(session, user_id: int | None = None) -> None:
+    """Recount todo_counters from todos, for one user or everyone."""
+    if session.get_bind().dialect.name == 'postgresql':
+        # keep writers out while the counts are replaced
+        await session.execute(text('LOCK TABLE todos IN SHARE MODE'))
+
+    counters = delete(TodoCounter)
+    counts = select(Todo.user_id, Todo.state, func.count(Todo.id)).group_by(
+        Todo.user_id, Todo.state
+    )
+    if user_id is not None:
+        counters = counters.where(TodoCounter.user_id == user_id)
+        counts = counts.where(Todo.user_id == user_id)
+
+    await session.execute(counters)
+    await session.execute(
+        insert(TodoCounter).from_select(
+            [TodoCounter.user_id, TodoCounter.state, TodoCounter.count],
+            counts,
+        )
+    )
+    await session.commit()
+
+
+async def main(user_id: int | None) -> None:  # pragma: no cover
+    async with session_scope() as session:
+        await rebuild_counters(session, user_id)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    parser = argparse.ArgumentParser(description='Rebuild todo_counters.')
+    parser.add_argument('--user-id', type=int)
+    asyncio.run(main(parser.parse_args().user_id))
@@ -0,0 +1,147 @@
+"""Startup warmup and cold start timing.
+
+Run from the app's lifespan so a new worker's first requests don't pay for
+opening pool connections, starting the Argon2 worker processes or compiling
+the hot statements. The time spent importing the app, warming up and
+serving the first request is logged and exported as `app_startup_seconds`.
+"""
+
+import asyncio
+import logging
+import time
+
+from fastapi.concurrency import run_in_threadpool
+from prometheus_client import Gauge
+from sqlalchemy import select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+import fast_api
+from fast_api.models import Todo, User
+from fast_api.pagination import paginate
+from fast_api.routers.todo import PUBLIC_COLUMNS
+from fast_api.security import deny_list, password_hasher
+from fast_api.statements import (
+    TODO_OF_USER,
+    TODO_VERSION,
+    USER_BY_EMAIL,
+    USER_BY_ID,
+)
+
+# uvicorn configures this logger, so the report shows up next to its own
+logger = logging.getLogger('uvicorn.error')
+
+STARTUP = Gauge(
+    'app_startup_seconds',
+    'Time spent in each cold start phase.',
+    ['phase'],
+    multiprocess_mode='max',
+)
+
+
+def record(phase: str, seconds: float) -> None:
+    STARTUP.labels(phase).set(seconds)
+    logger.info('cold start: %s took %.3fs', phase, seconds)
+
+
+async def open_connections(engine, count: int) -> None:
+    """Check out `count` connections at once so the pool keeps them."""
+    if isinstance(engine, AsyncEngine):
+        connections = await asyncio.gather(
+            *(engine.connect() for _ in range(count))
+        )
+        for connection in connections:
+            await connection.execute(text('SELECT 1'))
+            await connection.close()
+        return
+
+    def open_sync():
+        connections = [engine.connect() for _ in range(count)]
+        for connection in connections:
+            connection.execute(text('SELECT 1'))
+            connection.close()
+
+    await run_in_threadpool(open_sync)
+
+
+async def start_hashing() -> None:
+    # one verify per worker process, so each has imported pwdlib and run
+    # Argon2 once before a login needs it
+    hashed = await password_hasher.hash('warmup')
+    await asyncio.gather(
+        *(
+            password_hasher.verify('warmup', hashed)
+            for _ in range(max(1, password_hasher.workers))
+        )
+    )
+
+
+def common_statements():
+    """The statements behind auth and the list endpoints, with values that
+    match nothing; running them fills the engine's compiled cache."""
+    return [
+        (USER_BY_EMAIL, {'email': 'warmup@example.com'}),
+        (USER_BY_ID, {'user_id': 0}),
+        (TODO_OF_USER, {'owner_id': 0, 'todo_id': 0}),
+        (TODO_VERSION, {'user_id': 0}),
+        (
+            paginate(
+                select(*PUBLIC_COLUMNS).where(Todo.user_id == 0).offset(None),
+                Todo.id,
+                None,
+                100,
+            ),
+            None,
+        ),
+        (
+            paginate(
+                select(User.id, User.username, User.email)
+                .where(User.deleted_at.is_(None))
+                .offset(0),
+                User.id,
+                None,
+                10,
+            ),
+            None,
+        ),
+    ]
+
+
+async def compile_statements(session_factory) -> None:
+    async with session_factory() as session:
+        await deny_list.refresh(session)
+        for statement, params in common_statements():
+            await session.execute(statement, params)
+
+
+async def warmup(session_factory, engine, connections: int) -> None:
+    """Warm up each part independently; a failing step is logged and the
+    worker starts anyway, cold."""
+    start = time.perf_counter()
+    try:
+        await open_connections(engine, connections)
+        await compile_statements(session_factory)
+    except (SQLAlchemyError, OSError):
+        logger.warning('warmup: database not ready', exc_info=True)
+    try:
+        await start_hashing()
+    except OSError:
+        logger.warning('warmup: hashing workers failed', exc_info=True)
+    record('warmup', time.perf_counter() - start)
+
+
+class ColdStartTimer:
+    """ASGI middleware recording the time from the start of the app's
+    imports to the end of its first HTTP response."""
+
+    def __init__(self, app):
+        self.app = app
+        self.waiting = True
+
+    async def __call__(self, scope, receive, send):
+        await self.app(scope, receive, send)
+        if self.waiting and scope['type'] == 'http':
+            self.waiting = False
+            record(
+                'first_request', time.perf_counter() - fast_api.IMPORT_STARTED
+            )
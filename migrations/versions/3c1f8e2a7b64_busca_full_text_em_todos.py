@@ -0,0 +1,83 @@
+"""busca full text em todos
+
+Revision ID: 3c1f8e2a7b64
+Revises: 9b2ce7cb3727
+Create Date: 2026-10-18 10:12:41.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f8e2a7b64'
+down_revision: Union[str, None] = '9b2ce7cb3727'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE todos_fts USING fts5(
+                title, description, content='todos', content_rowid='id'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN
+                INSERT INTO todos_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN
+                INSERT INTO todos_fts(todos_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER todos_fts_au
+            AFTER UPDATE OF title, description ON todos BEGIN
+                INSERT INTO todos_fts(todos_fts, rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+                INSERT INTO todos_fts(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+        """)
+        # indexa as linhas que já existem
+        op.execute("INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')")
+
+    elif dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute("""
+            CREATE INDEX ix_todos_search ON todos USING gin (
+                to_tsvector('simple', title || ' ' || description)
+            )
+        """)
+        op.execute(
+            'CREATE INDEX ix_todos_title_trgm ON todos '
+            'USING gin (title gin_trgm_ops)'
+        )
+        op.execute(
+            'CREATE INDEX ix_todos_description_trgm ON todos '
+            'USING gin (description gin_trgm_ops)'
+        )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_au')
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_ai')
+        op.execute('DROP TABLE IF EXISTS todos_fts')
+
+    elif dialect == 'postgresql':
+        op.drop_index('ix_todos_description_trgm', table_name='todos')
+        op.drop_index('ix_todos_title_trgm', table_name='todos')
+        op.drop_index('ix_todos_search', table_name='todos')
@@ -0,0 +1,84 @@
+"""versao dos todos por usuario
+
+Revision ID: 5e8b21f4c0d9
+Revises: a4d7c09e5b13
+Create Date: 2026-10-18 14:21:09.774203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8b21f4c0d9'
+down_revision: Union[str, None] = 'a4d7c09e5b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = (
+    ('ai', 'INSERT', 'new', 'NEW'),
+    ('au', 'UPDATE', 'new', 'NEW'),
+    ('ad', 'DELETE', 'old', 'OLD'),
+)
+
+
+def upgrade() -> None:
+    op.create_table('todo_versions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.execute(
+        'INSERT INTO todo_versions (user_id, version) '
+        'SELECT DISTINCT user_id, 1 FROM todos'
+    )
+
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        for name, event, row, _ in TRIGGERS:
+            op.execute(f"""
+                CREATE TRIGGER todo_versions_{name} AFTER {event} ON todos
+                BEGIN
+                    INSERT INTO todo_versions (user_id, version)
+                    VALUES ({row}.user_id, 1)
+                    ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+                END
+            """)
+
+    elif dialect == 'postgresql':
+        op.execute("""
+            CREATE OR REPLACE FUNCTION bump_todo_versions() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                INSERT INTO todo_versions (user_id, version)
+                SELECT DISTINCT user_id, 1 FROM changed_rows
+                ON CONFLICT (user_id)
+                DO UPDATE SET version = todo_versions.version + 1;
+                RETURN NULL;
+            END
+            $$
+        """)
+        for name, event, _, table in TRIGGERS:
+            op.execute(f"""
+                CREATE TRIGGER todo_versions_{name} AFTER {event} ON todos
+                REFERENCING {table} TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_todo_versions()
+            """)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    for name, *_ in TRIGGERS:
+        if dialect == 'postgresql':
+            op.execute(f'DROP TRIGGER IF EXISTS todo_versions_{name} ON todos')
+        else:
+            op.execute(f'DROP TRIGGER IF EXISTS todo_versions_{name}')
+    if dialect == 'postgresql':
+        op.execute('DROP FUNCTION IF EXISTS bump_todo_versions()')
+
+    op.drop_table('todo_versions')
@@ -0,0 +1,90 @@
+"""sincronizacao incremental de todos
+
+Revision ID: 7a3e9d16b2f8
+Revises: cb6d55071ec4
+Create Date: 2026-10-18 17:48:32.592919
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3e9d16b2f8'
+down_revision: Union[str, None] = 'cb6d55071ec4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('todo_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('todo_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_todo_tombstones_user_id_deleted_at',
+        'todo_tombstones',
+        ['user_id', 'deleted_at'],
+        unique=False,
+    )
+
+    # todos created before updated_at was set on insert
+    op.execute(
+        'UPDATE todos SET updated_at = created_at WHERE updated_at IS NULL'
+    )
+    op.create_index(
+        'ix_todos_user_id_updated_at',
+        'todos',
+        ['user_id', 'updated_at'],
+        unique=False,
+    )
+
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("""
+            CREATE TRIGGER todo_tombstones_ad AFTER DELETE ON todos
+            BEGIN
+                INSERT INTO todo_tombstones (todo_id, user_id)
+                VALUES (old.id, old.user_id);
+            END
+        """)
+
+    elif dialect == 'postgresql':
+        op.execute("""
+            CREATE OR REPLACE FUNCTION record_todo_tombstones()
+            RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                INSERT INTO todo_tombstones (todo_id, user_id)
+                SELECT id, user_id FROM old_rows;
+                RETURN NULL;
+            END
+            $$
+        """)
+        op.execute("""
+            CREATE TRIGGER todo_tombstones_ad AFTER DELETE ON todos
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION record_todo_tombstones()
+        """)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute('DROP TRIGGER IF EXISTS todo_tombstones_ad ON todos')
+        op.execute('DROP FUNCTION IF EXISTS record_todo_tombstones()')
+    else:
+        op.execute('DROP TRIGGER IF EXISTS todo_tombstones_ad')
+
+    op.drop_index('ix_todos_user_id_updated_at', table_name='todos')
+    op.drop_index(
+        'ix_todo_tombstones_user_id_deleted_at', table_name='todo_tombstones'
+    )
+    op.drop_table('todo_tombstones')
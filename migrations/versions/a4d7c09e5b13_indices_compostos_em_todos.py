@@ -0,0 +1,41 @@
+"""indices compostos em todos
+
+Revision ID: a4d7c09e5b13
+Revises: 3c1f8e2a7b64
+Create Date: 2026-10-18 11:03:27.518844
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d7c09e5b13'
+down_revision: Union[str, None] = '3c1f8e2a7b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_todos_user_id_id',
+        'todos',
+        ['user_id', 'id'],
+        unique=False,
+        postgresql_include=[
+            'title', 'description', 'state', 'created_at', 'updated_at'
+        ],
+    )
+    op.create_index(
+        'ix_todos_user_id_state_id',
+        'todos',
+        ['user_id', 'state', 'id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todos_user_id_state_id', table_name='todos')
+    op.drop_index('ix_todos_user_id_id', table_name='todos')
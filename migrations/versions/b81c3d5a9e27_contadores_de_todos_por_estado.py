@@ -0,0 +1,127 @@
+"""contadores de todos por estado
+
+Revision ID: b81c3d5a9e27
+Revises: 5e8b21f4c0d9
+Create Date: 2026-10-18 15:02:44.130927
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81c3d5a9e27'
+down_revision: Union[str, None] = '5e8b21f4c0d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TODO_STATE = sa.Enum(
+    'draft', 'todo', 'doing', 'done', 'trash', name='todostate'
+).with_variant(
+    postgresql.ENUM(
+        'draft', 'todo', 'doing', 'done', 'trash',
+        name='todostate', create_type=False,
+    ),
+    'postgresql',
+)
+
+
+def upgrade() -> None:
+    op.create_table('todo_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('state', TODO_STATE, nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'state')
+    )
+    op.execute(
+        'INSERT INTO todo_counters (user_id, state, count) '
+        'SELECT user_id, state, count(*) FROM todos GROUP BY user_id, state'
+    )
+
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("""
+            CREATE TRIGGER todo_counters_ai AFTER INSERT ON todos
+            BEGIN
+                INSERT INTO todo_counters (user_id, state, count)
+                VALUES (new.user_id, new.state, 1)
+                ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1;
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER todo_counters_ad AFTER DELETE ON todos
+            BEGIN
+                UPDATE todo_counters SET count = count - 1
+                WHERE user_id = old.user_id AND state = old.state;
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER todo_counters_au
+            AFTER UPDATE OF user_id, state ON todos
+            BEGIN
+                UPDATE todo_counters SET count = count - 1
+                WHERE user_id = old.user_id AND state = old.state;
+                INSERT INTO todo_counters (user_id, state, count)
+                VALUES (new.user_id, new.state, 1)
+                ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1;
+            END
+        """)
+
+    elif dialect == 'postgresql':
+        op.execute("""
+            CREATE OR REPLACE FUNCTION count_todos() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    UPDATE todo_counters AS c SET count = c.count - d.n
+                    FROM (
+                        SELECT user_id, state, count(*) AS n
+                        FROM old_rows GROUP BY user_id, state
+                    ) AS d
+                    WHERE c.user_id = d.user_id AND c.state = d.state;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO todo_counters (user_id, state, count)
+                    SELECT user_id, state, count(*)
+                    FROM new_rows GROUP BY user_id, state
+                    ON CONFLICT (user_id, state)
+                    DO UPDATE SET count = todo_counters.count + excluded.count;
+                END IF;
+                RETURN NULL;
+            END
+            $$
+        """)
+        op.execute("""
+            CREATE TRIGGER todo_counters_ai AFTER INSERT ON todos
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION count_todos()
+        """)
+        op.execute("""
+            CREATE TRIGGER todo_counters_au AFTER UPDATE ON todos
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION count_todos()
+        """)
+        op.execute("""
+            CREATE TRIGGER todo_counters_ad AFTER DELETE ON todos
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION count_todos()
+        """)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+
+    for name in ('ai', 'au', 'ad'):
+        if dialect == 'postgresql':
+            op.execute(f'DROP TRIGGER IF EXISTS todo_counters_{name} ON todos')
+        else:
+            op.execute(f'DROP TRIGGER IF EXISTS todo_counters_{name}')
+    if dialect == 'postgresql':
+        op.execute('DROP FUNCTION IF EXISTS count_todos()')
+
+    op.drop_table('todo_counters')
@@ -0,0 +1,64 @@
+"""arquivo de todos na lixeira
+
+Revision ID: e5c0b7a4f192
+Revises: d2f6a1c84e30
+Create Date: 2026-10-18 16:52:11.607797
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5c0b7a4f192'
+down_revision: Union[str, None] = 'd2f6a1c84e30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TODO_STATE = sa.Enum(
+    'draft', 'todo', 'doing', 'done', 'trash', name='todostate'
+).with_variant(
+    postgresql.ENUM(
+        'draft', 'todo', 'doing', 'done', 'trash',
+        name='todostate', create_type=False,
+    ),
+    'postgresql',
+)
+
+
+def upgrade() -> None:
+    op.create_table('todos_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(), nullable=False),
+    sa.Column('description', sa.String(), nullable=False),
+    sa.Column('state', TODO_STATE, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_todos_archive_user_id_id',
+        'todos_archive',
+        ['user_id', 'id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_todos_trash_id',
+        'todos',
+        ['id'],
+        unique=False,
+        sqlite_where=sa.text("state = 'trash'"),
+        postgresql_where=sa.text("state = 'trash'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todos_trash_id', table_name='todos')
+    op.drop_index('ix_todos_archive_user_id_id', table_name='todos_archive')
+    op.drop_table('todos_archive')
@@ -1,15 +1,29 @@
+from contextlib import asynccontextmanager
+
 import factory
 import factory.fuzzy
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 from fast_api.app import app
-from fast_api.database import get_session
+from fast_api.database import get_session_factory
+from fast_api.hashing import get_password_hash
 from fast_api.models import Todo, TodoState, User, table_registry
-from fast_api.security import get_password_hash
+from fast_api.ratelimit import limiters
+from fast_api.security import deny_list, password_hasher, user_cache
+from fast_api.settings import get_settings
+
+# the warmup and the jobs target the configured database, not the
+# per-test one
+get_settings().WARMUP_ENABLED = False
+get_settings().JOBS_ENABLED = False
+# every client's lifespan would otherwise start and stop a process pool;
+# tests/test_hashing.py covers the pool itself
+password_hasher.workers = 0
 
 
 class UserFactory(factory.Factory):
@@ -32,22 +46,41 @@ class TodoFactory(factory.Factory):
 
 
 @pytest.fixture()
-def client(session: Session):
-    def get_session_override():
-        return session
+def database_path(tmp_path):
+    # the app talks to the database through aiosqlite while the tests seed
+    # it with a sync session, so both need to open the same file
+    return tmp_path / 'test.db'
+
+
+@pytest.fixture()
+def client(session: Session, database_path):
+    engine = create_async_engine(
+        f'sqlite+aiosqlite:///{database_path}', poolclass=NullPool
+    )
+
+    @asynccontextmanager
+    async def session_factory(read_only=False):
+        async with AsyncSession(
+            engine, expire_on_commit=False
+        ) as async_session:
+            yield async_session
 
     with TestClient(app) as client:
-        app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_session_factory] = lambda: session_factory
         yield client
     app.dependency_overrides.clear()
+    user_cache.clear()
+    deny_list.clear()
+    for limiter in limiters.values():
+        limiter.clear()
 
 
 @pytest.fixture()
-def session():
+def session(database_path):
     engine = create_engine(
-        'sqlite:///:memory:',
+        f'sqlite:///{database_path}',
         connect_args={'check_same_thread': False},
-        poolclass=StaticPool,
+        poolclass=NullPool,
     )
     table_registry.metadata.create_all(engine)
 
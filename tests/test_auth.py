@@ -1,10 +1,16 @@
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from http import HTTPStatus
 
 from fastapi.testclient import TestClient
 from freezegun import freeze_time
+from jwt import decode
+from sqlalchemy.orm import Session
 
-from fast_api.models import User
+from fast_api.app import app
+from fast_api.database import get_session_factory
+from fast_api.models import RevokedToken, User
+from fast_api.security import deny_list, settings
 from fast_api.settings import Settings
 
 
@@ -111,3 +117,118 @@ def test_refresh_token_expired_token(client: TestClient, user: User):
         )
         assert response.status_code == HTTPStatus.UNAUTHORIZED
         assert response.json() == {'detail': 'Could not validade credentials'}
+
+
+def test_logout_revokes_token(client: TestClient, token):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    client.post('/auth/refresh_token', headers=headers)
+
+    response = client.post('/auth/logout', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'message': 'Logged out'}
+
+    response = client.post('/auth/refresh_token', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_logout_keeps_other_tokens_valid(client: TestClient, user: User):
+    form = {'username': user.email, 'password': user.clean_password}
+    first = client.post('/auth/token', data=form).json()['access_token']
+    second = client.post('/auth/token', data=form).json()['access_token']
+
+    client.post('/auth/logout', headers={'Authorization': f'Bearer {first}'})
+
+    response = client.post(
+        '/auth/refresh_token', headers={'Authorization': f'Bearer {second}'}
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_token_revoked_elsewhere_is_rejected_after_refresh(
+    client: TestClient, session: Session, user: User, token
+):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    client.post('/auth/refresh_token', headers=headers)
+    payload = decode(
+        token['access_token'],
+        key=settings.SECRET_KEY,
+        algorithms=[settings.ALGORITHM],
+    )
+    # as another worker would: only the table knows about it
+    session.add(
+        RevokedToken(
+            jti=payload['jti'],
+            user_id=user.id,
+            expires_at=datetime.now() + timedelta(hours=1),
+        )
+    )
+    session.commit()
+
+    response = client.post('/auth/refresh_token', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+
+    deny_list._refreshed_at = None
+    response = client.post('/auth/refresh_token', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_logout_of_a_token_revoked_elsewhere(
+    client: TestClient, session: Session, user: User, token
+):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    client.post('/auth/refresh_token', headers=headers)
+    payload = decode(
+        token['access_token'],
+        key=settings.SECRET_KEY,
+        algorithms=[settings.ALGORITHM],
+    )
+    # another worker logged it out; this one's deny list is not stale yet
+    session.add(
+        RevokedToken(
+            jti=payload['jti'],
+            user_id=user.id,
+            expires_at=datetime.now() + timedelta(hours=1),
+        )
+    )
+    session.commit()
+
+    response = client.post('/auth/logout', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+
+    response = client.post('/auth/refresh_token', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_deny_list_is_refreshed_from_the_primary(
+    client: TestClient, token, monkeypatch
+):
+    session_factory = app.dependency_overrides[get_session_factory]()
+
+    @asynccontextmanager
+    async def tagged_session_factory(read_only=False):
+        async with session_factory(read_only=read_only) as session:
+            session.info['read_only'] = read_only
+            yield session
+
+    refreshed_from = []
+    refresh = deny_list.refresh
+
+    async def recording_refresh(session):
+        refreshed_from.append(session.info['read_only'])
+        await refresh(session)
+
+    monkeypatch.setitem(
+        app.dependency_overrides,
+        get_session_factory,
+        lambda: tagged_session_factory,
+    )
+    monkeypatch.setattr(deny_list, 'refresh', recording_refresh)
+    deny_list._refreshed_at = None
+
+    response = client.get(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert refreshed_from == [False]
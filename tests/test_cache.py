@@ -0,0 +1,64 @@
+from fast_api.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_counts_hits_and_misses():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'size': 1, 'maxsize': 2}
+
+
+def test_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=2)
+
+    clock.now = 5
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+
+    clock.now = 10
+    assert cache.get('a') is None
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set('a', 'first')
+    cache.set('b', 'second')
+    cache.get('a')
+    cache.set('c', 'third')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'first'
+    assert cache.get('c') == 'third'
+
+
+def test_cache_discard_where():
+    cache = TTLCache(maxsize=3, ttl=10)
+    cache.set('a', 'stale')
+    cache.set('b', 'fresh')
+    cache.set('c', 'stale')
+
+    cache.discard_where(lambda value: value == 'stale')
+
+    assert len(cache) == 1
+    assert cache.get('b') == 'fresh'
+
+
+def test_cache_with_zero_size_is_disabled():
+    cache = TTLCache(maxsize=0, ttl=10)
+    cache.set('a', 1)
+
+    assert cache.get('a') is None
@@ -1,7 +1,29 @@
-from sqlalchemy import select
+import asyncio
+from contextlib import asynccontextmanager
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select, text, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import NullPool
 
-from fast_api.models import User
+from fast_api import database
+from fast_api.app import app
+from fast_api.cache import TTLCache
+from fast_api.database import (
+    ReplicaSet,
+    RoutingSession,
+    ThreadedSession,
+    get_session,
+    get_session_factory,
+    sync_connect_args,
+    to_async_url,
+)
+from fast_api.models import User, table_registry
+from tests.test_cache import FakeClock
 
 
 def test_create_user(session: Session):
@@ -13,3 +35,180 @@ def test_create_user(session: Session):
 
     user = session.scalar(select(User).where(User.username == 'alice'))
     assert user.username == 'alice'
+
+
+def test_to_async_url_swaps_driver():
+    assert to_async_url('sqlite:///database.db') == (
+        'sqlite+aiosqlite:///database.db'
+    )
+    assert to_async_url('postgresql+psycopg://app:pw@db/app') == (
+        'postgresql+asyncpg://app:pw@db/app'
+    )
+
+
+def test_threaded_session_serves_requests(session: Session, database_path):
+    engine = create_engine(
+        f'sqlite:///{database_path}',
+        connect_args=sync_connect_args(f'sqlite:///{database_path}'),
+    )
+
+    async def get_session_override():
+        threaded = ThreadedSession(Session(engine, expire_on_commit=False))
+        try:
+            yield threaded
+        finally:
+            await threaded.close()
+
+    app.dependency_overrides[get_session] = get_session_override
+    with TestClient(app) as client:
+        response = client.post(
+            '/users/',
+            json={
+                'username': 'alice',
+                'email': 'alice@test.com',
+                'password': 'secret',
+            },
+        )
+        assert response.status_code == HTTPStatus.CREATED
+
+        response = client.get(f'/users/{response.json()["id"]}')
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['username'] == 'alice'
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+def test_todo_listing_uses_composite_indexes(session: Session):
+    plan = session.execute(
+        text(
+            'EXPLAIN QUERY PLAN SELECT * FROM todos '
+            'WHERE user_id = 1 AND id > 10 ORDER BY id'
+        )
+    ).all()
+    assert 'ix_todos_user_id_id' in plan[0].detail
+
+    plan = session.execute(
+        text(
+            'EXPLAIN QUERY PLAN SELECT * FROM todos '
+            "WHERE user_id = 1 AND state = 'done' ORDER BY id"
+        )
+    ).all()
+    assert 'ix_todos_user_id_state_id' in plan[0].detail
+
+
+def seeded_engine(path, username):
+    engine = create_engine(f'sqlite:///{path}')
+    table_registry.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(User).values(
+                username=username, email=f'{username}@test.com', password='x'
+            )
+        )
+    return engine
+
+
+def test_routing_session_reads_replica_until_it_writes(tmp_path):
+    primary = seeded_engine(tmp_path / 'primary.db', 'primary')
+    replica = seeded_engine(tmp_path / 'replica.db', 'replica')
+    query = select(User.username)
+
+    with RoutingSession(primary, replicas=ReplicaSet([replica], 30)) as s:
+        assert s.scalar(query) == 'replica'
+
+        s.execute(update(User).values(password='y'))
+        assert s.scalar(query) == 'primary'
+
+
+def test_replica_set_skips_failed_replicas(tmp_path):
+    clock = FakeClock()
+    broken = create_engine(f'sqlite:///{tmp_path}/missing/replica.db')
+    healthy = seeded_engine(tmp_path / 'replica.db', 'replica')
+    replicas = ReplicaSet([broken, healthy], retry_seconds=30, clock=clock)
+
+    with RoutingSession(healthy, replicas=replicas) as s:
+        assert s.get_bind() is broken
+        with pytest.raises(OperationalError):
+            s.scalar(select(User.username))
+
+    assert [replicas.choose() for _ in range(3)] == [healthy] * 3
+    assert [r['healthy'] for r in replicas.status()] == [False, True]
+
+    clock.now = 30
+    assert {replicas.choose() for _ in range(2)} == {broken, healthy}
+
+
+def test_get_session_reads_from_replica_unless_client_just_wrote(
+    client: TestClient, tmp_path, monkeypatch
+):
+    replica = seeded_engine(tmp_path / 'replica.db', 'replica')
+    monkeypatch.setattr(database, 'replicas', ReplicaSet([replica], 30))
+    monkeypatch.setattr(database, 'recent_writers', TTLCache(10, 5))
+    session_factory = app.dependency_overrides[get_session_factory]()
+    calls = []
+
+    @asynccontextmanager
+    async def recording_factory(read_only=False):
+        calls.append(read_only)
+        async with session_factory(read_only) as session:
+            yield session
+
+    app.dependency_overrides[get_session_factory] = lambda: recording_factory
+
+    client.get('/users/')
+    client.post(
+        '/users/',
+        json={'username': 'x', 'email': 'x@test.com', 'password': 'x'},
+    )
+    client.get('/users/')
+
+    assert calls == [True, False, False]
+
+
+@pytest.mark.parametrize('mode', ['async', 'sync'])
+def test_session_scope_reads_replica_only_when_read_only(
+    tmp_path, monkeypatch, mode
+):
+    primary = seeded_engine(tmp_path / 'primary.db', 'primary')
+    replica = seeded_engine(tmp_path / 'replica.db', 'replica')
+    if mode == 'async':
+        primary = create_async_engine(
+            f'sqlite+aiosqlite:///{tmp_path}/primary.db', poolclass=NullPool
+        )
+    monkeypatch.setattr(database.settings, 'DATABASE_MODE', mode)
+    monkeypatch.setattr(database, 'engine', primary)
+    monkeypatch.setattr(database, 'replicas', ReplicaSet([replica], 30))
+
+    async def read(read_only):
+        async with get_session_factory()(read_only=read_only) as session:
+            return await session.scalar(select(User.username))
+
+    assert asyncio.run(read(read_only=True)) == 'replica'
+    assert asyncio.run(read(read_only=False)) == 'primary'
+
+
+def test_requests_go_through_session_scope(
+    client: TestClient, database_path, tmp_path, monkeypatch
+):
+    replica = seeded_engine(tmp_path / 'replica.db', 'replica')
+    monkeypatch.setattr(
+        database,
+        'engine',
+        create_async_engine(
+            f'sqlite+aiosqlite:///{database_path}', poolclass=NullPool
+        ),
+    )
+    monkeypatch.setattr(database, 'replicas', ReplicaSet([replica], 30))
+    monkeypatch.setattr(database, 'recent_writers', TTLCache(10, 5))
+    monkeypatch.delitem(app.dependency_overrides, get_session_factory)
+
+    response = client.get('/users/')
+    assert [u['username'] for u in response.json()['users']] == ['replica']
+
+    client.post(
+        '/users/',
+        json={'username': 'x', 'email': 'x@test.com', 'password': 'x'},
+    )
+    # the client just wrote, so it reads its write from the primary
+    response = client.get('/users/')
+    assert [u['username'] for u in response.json()['users']] == ['x']
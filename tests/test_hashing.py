@@ -0,0 +1,59 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+
+from fast_api.hashing import HashingPool
+
+
+@pytest.fixture()
+def pool():
+    pool = HashingPool(workers=1, max_pending=2)
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_hashes_in_worker_process(pool: HashingPool):
+    async def hash_and_verify():
+        hashed = await pool.hash('secret')
+        return (
+            await pool.verify('secret', hashed),
+            await pool.verify('wrong', hashed),
+        )
+
+    assert asyncio.run(hash_and_verify()) == (True, False)
+    assert pool.stats()['completed'] == 3  # noqa: PLR2004
+    assert pool.stats()['pending'] == 0
+
+
+def test_pool_rejects_calls_over_max_pending(pool: HashingPool):
+    async def burst():
+        return await asyncio.gather(
+            *(pool.hash('secret') for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(burst())
+
+    errors = [r for r in results if isinstance(r, HTTPException)]
+    assert len(errors) == 1
+    assert errors[0].status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert pool.stats()['rejected'] == 1
+
+
+def test_pool_counts_failed_calls_apart(pool: HashingPool):
+    with pytest.raises(TypeError):
+        asyncio.run(pool.run(len, 1))
+
+    assert pool.stats()['failed'] == 1
+    assert pool.stats()['completed'] == 0
+    assert pool.stats()['pending'] == 0
+
+
+def test_pool_without_workers_uses_threadpool():
+    pool = HashingPool(workers=0, max_pending=1)
+
+    hashed = asyncio.run(pool.hash('secret'))
+
+    assert hashed.startswith('$argon2')
+    assert pool._executor is None
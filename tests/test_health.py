@@ -0,0 +1,61 @@
+from http import HTTPStatus
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from fast_api.models import table_registry
+from fast_api.pool_metrics import PoolMetrics, instrumented_pool_class
+from fast_api.statements import USER_BY_ID, CompiledCacheStats
+
+
+def test_health_db(client: TestClient):
+    response = client.get('/health/db')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['status'] == 'ok'
+    assert response.json()['latency_ms'] >= 0
+    assert 'checked_out' in response.json()['pool']
+    assert 'hit_ratio' in response.json()['compiled_cache']
+
+
+def test_pool_metrics_track_checkouts_and_wait(tmp_path):
+    metrics = PoolMetrics()
+    engine = create_engine(
+        f'sqlite:///{tmp_path / "pool.db"}',
+        poolclass=instrumented_pool_class(False, metrics),
+        pool_size=1,
+        max_overflow=1,
+    )
+    metrics.listen(engine)
+
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text('SELECT 1'))
+        second.execute(text('SELECT 1'))
+        snapshot = metrics.snapshot(engine.pool)
+        assert snapshot['checked_out'] == 2  # noqa: PLR2004
+        assert snapshot['overflow'] == 1
+
+    snapshot = metrics.snapshot(engine.pool)
+    assert snapshot['checked_out'] == 0
+    assert snapshot['checkouts'] == snapshot['checkins'] == 2  # noqa: PLR2004
+    assert snapshot['connects'] == 2  # noqa: PLR2004
+    assert snapshot['wait_count'] == 2  # noqa: PLR2004
+    engine.dispose()
+
+
+def test_compiled_cache_stats_count_hits_and_misses(tmp_path):
+    stats = CompiledCacheStats()
+    engine = create_engine(f'sqlite:///{tmp_path / "cache.db"}')
+    table_registry.metadata.create_all(engine)
+    stats.listen(engine)
+
+    with Session(engine) as session:
+        for user_id in range(3):
+            session.scalar(USER_BY_ID, {'user_id': user_id})
+
+    snapshot = stats.snapshot()
+    assert snapshot['miss'] == 1
+    assert snapshot['hit'] == 2  # noqa: PLR2004
+    assert snapshot['hit_ratio'] == 2 / 3
+    engine.dispose()
@@ -0,0 +1,169 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool, QueuePool
+
+from fast_api.database import ThreadedSession
+from fast_api.jobs import (
+    JobRunner,
+    pool_busy,
+    purge_deleted_users,
+    purge_revoked_tokens,
+)
+from fast_api.models import (
+    RevokedToken,
+    Todo,
+    TodoCounter,
+    TodoState,
+    TodoTombstone,
+    TodoVersion,
+    User,
+)
+from tests.conftest import TodoFactory
+
+
+def test_purge_deleted_users_in_batches(
+    session: Session, user: User, other_user: User
+):
+    session.add_all(
+        TodoFactory.create_batch(5, user_id=user.id, state=TodoState.todo)
+        + [TodoFactory(user_id=other_user.id)]
+    )
+    user.deleted_at = datetime.now()
+    session.commit()
+    pauses = []
+
+    async def throttle():
+        pauses.append(1)
+
+    purged = asyncio.run(
+        purge_deleted_users(ThreadedSession(session), 2, throttle)
+    )
+
+    # 5 todos, their 5 tombstones and the user, 2 rows per batch
+    assert purged == 11  # noqa: PLR2004
+    assert len(pauses) == 4  # noqa: PLR2004
+    assert session.scalars(select(User.id)).all() == [other_user.id]
+    assert session.scalars(select(Todo.user_id)).all() == [other_user.id]
+    for model in (TodoCounter, TodoVersion, TodoTombstone):
+        owners = session.scalars(select(model.user_id)).all()
+        assert set(owners) <= {other_user.id}
+
+
+def test_purge_revoked_tokens_keeps_unexpired(session: Session, user: User):
+    now = datetime.now()
+    session.add_all(
+        [
+            RevokedToken(
+                jti='old', user_id=user.id, expires_at=now - timedelta(1)
+            ),
+            RevokedToken(
+                jti='new', user_id=user.id, expires_at=now + timedelta(1)
+            ),
+        ]
+    )
+    session.commit()
+
+    purged = asyncio.run(purge_revoked_tokens(ThreadedSession(session), 10))
+
+    assert purged == 1
+    assert session.scalars(select(RevokedToken.jti)).all() == ['new']
+
+
+class FakeSessionFactory:
+    """Stands in for session_scope, yielding `session` every time."""
+
+    def __init__(self, session=None):
+        self.session = session
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self.session
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+
+def test_job_runner_keeps_going_after_a_failure(session: Session):
+    async def broken(session):
+        await session.execute(select(func.no_such_function()))
+
+    async def count_users(session):
+        return await session.scalar(select(func.count(User.id)))
+
+    runner = JobRunner(
+        FakeSessionFactory(ThreadedSession(session)),
+        {'broken': broken, 'count_users': count_users},
+        interval=60,
+    )
+
+    assert asyncio.run(runner.run_once()) == {
+        'broken': None,
+        'count_users': 0,
+    }
+
+
+def test_job_runner_runs_every_interval_until_stopped():
+    rounds = []
+
+    async def job(session):
+        rounds.append(session)
+        return 0
+
+    async def run():
+        runner = JobRunner(FakeSessionFactory(), {'job': job}, interval=0.01)
+        runner.start()
+        await asyncio.sleep(0.1)
+        await runner.stop()
+        stopped_at = len(rounds)
+        await asyncio.sleep(0.05)
+        return stopped_at
+
+    stopped_at = asyncio.run(run())
+
+    assert stopped_at > 1
+    assert len(rounds) == stopped_at
+
+
+def test_job_runner_survives_unexpected_errors():
+    rounds = []
+
+    async def buggy(session):
+        raise RuntimeError('bug')
+
+    async def job(session):
+        rounds.append(session)
+        return 0
+
+    async def run():
+        runner = JobRunner(
+            FakeSessionFactory(), {'buggy': buggy, 'job': job}, interval=0.01
+        )
+        runner.start()
+        await asyncio.sleep(0.1)
+        task = runner._task
+        await runner.stop()
+        return task
+
+    task = asyncio.run(run())
+
+    assert len(rounds) > 1
+    assert task.cancelled()
+
+
+def test_pool_busy_only_when_every_connection_is_out():
+    def creator():
+        return sqlite3.connect(':memory:')
+
+    pool = QueuePool(creator, pool_size=1, max_overflow=0)
+    assert not pool_busy(pool)
+    connection = pool.connect()
+    assert pool_busy(pool)
+    connection.close()
+    assert not pool_busy(pool)
+    assert not pool_busy(NullPool(creator))
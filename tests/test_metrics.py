@@ -0,0 +1,71 @@
+from http import HTTPStatus
+
+from fast_api.metrics import UNMATCHED
+
+
+def test_metrics_label_requests_by_route_template(client, user, token):
+    client.get(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert (
+        'http_requests_total{method="GET",route="/users/{user_id}",'
+        'status="200"}' in response.text
+    )
+    assert f'route="/users/{user.id}"' not in response.text
+    assert (
+        'http_request_duration_seconds_bucket{le="0.005",method="GET",'
+        'route="/users/{user_id}"}' in response.text
+    )
+    assert 'http_requests_in_flight{method="GET",route="/metrics"}' in (
+        response.text
+    )
+
+
+def test_metrics_group_unknown_paths(client):
+    client.get('/no/such/path')
+
+    response = client.get('/metrics')
+
+    assert (
+        f'http_requests_total{{method="GET",route="{UNMATCHED}",'
+        'status="404"}' in response.text
+    )
+
+
+def test_metrics_record_status_of_rejected_method(client):
+    client.put('/')
+
+    response = client.get('/metrics')
+
+    assert (
+        'http_requests_total{method="PUT",route="/",status="405"}'
+        in response.text
+    )
+
+
+def test_metrics_export_password_hashing_load(client, token):
+    response = client.get('/metrics')
+
+    assert 'password_hashing_pending 0.0' in response.text
+    assert 'password_hashing_queue_depth 0.0' in response.text
+    assert 'password_hashing_calls_total{outcome="completed"}' in (
+        response.text
+    )
+
+
+def test_metrics_count_auth_cache_lookups(client, user, token):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    client.get('/todos/', headers=headers)
+    client.get('/todos/', headers=headers)
+
+    response = client.get('/metrics')
+
+    assert 'cache_lookups_total{cache="users",result="miss"}' in (
+        response.text
+    )
+    assert 'cache_lookups_total{cache="users",result="hit"}' in (response.text)
@@ -0,0 +1,114 @@
+from http import HTTPStatus
+
+from fastapi.testclient import TestClient
+
+from fast_api.ratelimit import RateLimiter, get_limiter, settings
+from tests.test_cache import FakeClock
+
+
+def test_limiter_allows_burst_then_asks_to_wait():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=2, burst=3, clock=clock)
+
+    assert [limiter.acquire('a') for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire('a') == 0.5  # noqa: PLR2004
+    assert limiter.acquire('b') == 0
+
+    clock.now = 0.5
+    assert limiter.acquire('a') == 0
+
+
+def test_limiter_evicts_idle_keys():
+    clock = FakeClock()
+    limiter = RateLimiter(rate=1, burst=2, clock=clock)
+    limiter.acquire('a')
+    clock.now = 1
+    limiter.acquire('b')
+
+    clock.now = 2
+    limiter.acquire('c')
+
+    # 'a' had refilled to its burst and was dropped; 'b' has not yet
+    assert len(limiter) == 2  # noqa: PLR2004
+
+
+def test_limiter_with_zero_rate_is_disabled():
+    limiter = RateLimiter(rate=0, burst=0)
+
+    assert all(limiter.acquire('a') == 0 for _ in range(100))
+    assert len(limiter) == 0
+
+
+def enable(limiter: RateLimiter, monkeypatch, rate: float, burst: int):
+    monkeypatch.setattr(limiter, 'rate', rate)
+    monkeypatch.setattr(limiter, 'burst', burst)
+    monkeypatch.setattr(limiter, 'idle_seconds', burst / rate)
+
+
+def test_login_is_limited_per_ip(client: TestClient, user, monkeypatch):
+    limiter = get_limiter('auth')
+    # each failed login spends a password hash; don't let it refill meanwhile
+    enable(limiter, monkeypatch, rate=0.01, burst=3)
+    form = {'username': user.email, 'password': 'wrong'}
+    for _ in range(limiter.burst):
+        response = client.post('/auth/token', data=form)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    response = client.post('/auth/token', data=form)
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response.json() == {'detail': 'Too many requests.'}
+    assert int(response.headers['retry-after']) >= 1
+
+
+def test_todos_are_limited_per_user(
+    client: TestClient, token, other_user, monkeypatch
+):
+    limiter = get_limiter('todo')
+    monkeypatch.setattr(limiter, 'burst', 1)
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+
+    assert client.get('/todos/', headers=headers).status_code == HTTPStatus.OK
+    response = client.get('/todos/', headers=headers)
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert 'retry-after' in response.headers
+
+
+def test_login_is_limited_per_forwarded_address(
+    client: TestClient, user, monkeypatch
+):
+    enable(get_limiter('auth'), monkeypatch, rate=0.01, burst=1)
+    monkeypatch.setattr(settings, 'RATE_LIMIT_TRUSTED_PROXIES', 1)
+    form = {'username': user.email, 'password': 'wrong'}
+
+    def login(forwarded_for):
+        return client.post(
+            '/auth/token',
+            data=form,
+            headers={'X-Forwarded-For': forwarded_for},
+        ).status_code
+
+    assert login('spoofed, 10.0.0.1') == HTTPStatus.BAD_REQUEST
+    assert login('10.0.0.1') == HTTPStatus.TOO_MANY_REQUESTS
+    assert login('10.0.0.2') == HTTPStatus.BAD_REQUEST
+
+
+def test_refresh_token_is_limited_per_user(
+    client: TestClient, token, other_user, monkeypatch
+):
+    other_token = client.post(
+        '/auth/token',
+        data={'username': other_user.email, 'password': 'testtest'},
+    ).json()
+    enable(get_limiter('auth'), monkeypatch, rate=0.01, burst=1)
+
+    def refresh(token):
+        return client.post(
+            '/auth/refresh_token',
+            headers={'Authorization': f'Bearer {token["access_token"]}'},
+        ).status_code
+
+    assert refresh(token) == HTTPStatus.OK
+    assert refresh(token) == HTTPStatus.TOO_MANY_REQUESTS
+    assert refresh(other_token) == HTTPStatus.OK
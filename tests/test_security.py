@@ -3,7 +3,7 @@ from http import HTTPStatus
 from fastapi.testclient import TestClient
 from jwt import decode
 
-from fast_api.security import create_access_token, settings
+from fast_api.security import create_access_token, settings, user_cache
 
 
 def test_jwt():
@@ -16,6 +16,14 @@ def test_jwt():
 
     assert result['sub'] == data['sub']
     assert result['exp']
+    assert (
+        result['jti']
+        != decode(
+            create_access_token(data),
+            key=settings.SECRET_KEY,
+            algorithms=[settings.ALGORITHM],
+        )['jti']
+    )
 
 
 def test_jwt_invalid_token(client: TestClient):
@@ -48,3 +56,45 @@ def test_jwt_invalid_token_missing_user_in_db(client: TestClient):
     assert response.status_code == HTTPStatus.UNAUTHORIZED
 
     assert response.json() == {'detail': 'Could not validade credentials'}
+
+
+def test_current_user_is_served_from_cache(client: TestClient, token):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    client.post('/auth/refresh_token', headers=headers)
+    hits = user_cache.hits
+
+    response = client.post('/auth/refresh_token', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert user_cache.hits == hits + 1
+
+
+def test_update_user_invalidates_cached_user(client: TestClient, user, token):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    client.post('/auth/refresh_token', headers=headers)
+
+    response = client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': 'bob',
+            'email': 'bob@example.com',
+            'password': 'mynewpassword',
+        },
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    # the token still names the old email, which no longer exists
+    response = client.post('/auth/refresh_token', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_delete_user_with_cached_user(client: TestClient, user, token):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    client.post('/auth/refresh_token', headers=headers)
+
+    response = client.delete(f'/users/{user.id}', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+
+    response = client.post('/auth/refresh_token', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
@@ -1,11 +1,25 @@
+import asyncio
+import csv
 import datetime
+import io
+import json
 from http import HTTPStatus
 from typing import Any
 
 from fastapi.testclient import TestClient
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm.session import Session
 
-from fast_api.models import TodoState, User
+from fast_api import pagination
+from fast_api.archive import archive_trash
+from fast_api.changes import decode_since, encode_since
+from fast_api.database import ThreadedSession
+from fast_api.models import ArchivedTodo, Todo, TodoCounter, TodoState, User
+from fast_api.revocation import utcnow
+from fast_api.search import search
+from fast_api.settings import Settings
+from fast_api.stats import rebuild_counters
 from tests.conftest import TodoFactory
 
 
@@ -36,7 +50,7 @@ def test_create_todo(
         'state': 'draft',
         'user_id': user.id,
         'created_at': data.strftime('%Y-%m-%dT%H:%M:%S'),
-        'updated_at': None,
+        'updated_at': data.strftime('%Y-%m-%dT%H:%M:%S'),
     }
 
 
@@ -71,6 +85,43 @@ def test_list_todos_pagination_should_return_2_todos(
     assert len(response.json()['todos']) == expected_todos
 
 
+def test_list_todos_cursor_pagination_should_walk_all_pages(
+    client: TestClient, user: User, session: Session, token: dict
+):
+    session.bulk_save_objects(TodoFactory.create_batch(5, user_id=user.id))
+    session.commit()
+
+    seen, cursor = [], ''
+    for _ in range(3):
+        response = client.get(
+            f'/todos/?limit=2&cursor={cursor}',
+            headers={'Authorization': f'Bearer {token["access_token"]}'},
+        )
+        assert response.status_code == HTTPStatus.OK
+        seen += [todo['id'] for todo in response.json()['todos']]
+        cursor = response.json()['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == [1, 2, 3, 4, 5]
+    assert cursor is None
+
+
+def test_list_todos_zero_or_negative_limit_is_an_empty_page(
+    client: TestClient, user: User, session: Session, token: dict
+):
+    session.bulk_save_objects(TodoFactory.create_batch(2, user_id=user.id))
+    session.commit()
+
+    for limit in (0, -1, -5):
+        response = client.get(
+            f'/todos/?limit={limit}',
+            headers={'Authorization': f'Bearer {token["access_token"]}'},
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {'todos': [], 'next_cursor': None}
+
+
 def test_list_todos_filter_title_should_return_5_todos(
     client: TestClient,
     user: User,
@@ -155,6 +206,112 @@ def test_list_todos_filter_combined_should_return_5_todos(
     assert len(response.json()['todos']) == expected_todos
 
 
+def test_list_todos_fast_path_matches_validated_response(
+    client: TestClient,
+    user: User,
+    session: Session,
+    token: dict,
+    monkeypatch,
+):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    session.commit()
+
+    fast = client.get('/todos/?limit=2', headers=headers)
+    monkeypatch.setattr(pagination.settings, 'FAST_LIST_RESPONSES', False)
+    validated = client.get('/todos/?limit=2', headers=headers)
+
+    assert fast.status_code == validated.status_code == HTTPStatus.OK
+    assert fast.json() == validated.json()
+    assert fast.headers['etag'] == validated.headers['etag']
+    assert fast.json()['next_cursor']
+
+
+def test_list_todos_search_should_rank_matches(
+    client: TestClient, user: User, session: Session, token: dict
+):
+    session.add_all(
+        [
+            TodoFactory(
+                user_id=user.id, title='Groceries', description='buy milk'
+            ),
+            TodoFactory(
+                user_id=user.id,
+                title='Milk the cows',
+                description='milk, milk and more milk',
+            ),
+            TodoFactory(user_id=user.id, title='Laundry', description='socks'),
+        ]
+    )
+    session.commit()
+
+    response = client.get(
+        '/todos/?q=milk',
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    titles = [todo['title'] for todo in response.json()['todos']]
+    assert titles == ['Milk the cows', 'Groceries']
+
+
+def test_list_todos_search_follows_updates_and_deletes(
+    client: TestClient, user: User, session: Session, token: dict
+):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    todo = TodoFactory(user_id=user.id, title='Dentist', description='call')
+    other = TodoFactory(user_id=user.id, title='Dentist', description='pay')
+    session.add_all([todo, other])
+    session.commit()
+
+    client.patch(
+        f'/todos/{todo.id}', json={'title': 'Doctor'}, headers=headers
+    )
+    client.delete(f'/todos/{other.id}', headers=headers)
+
+    response = client.get('/todos/?q=dent', headers=headers)
+    assert response.json()['todos'] == []
+
+    response = client.get('/todos/?q=doc', headers=headers)
+    assert [t['id'] for t in response.json()['todos']] == [todo.id]
+
+
+def test_list_todos_search_ignores_control_characters(
+    client: TestClient, user: User, session: Session, token: dict
+):
+    session.add(TodoFactory(user_id=user.id, title='Milk', description='x'))
+    session.commit()
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+
+    response = client.get('/todos/?q=mi%00lk', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+
+    response = client.get('/todos/?q=%00', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()['todos']) == 1
+
+
+def test_search_on_postgres_matches_the_index_expression():
+    query = search(select(Todo), 'milk', 'postgresql').compile(
+        dialect=postgresql.dialect(),
+        compile_kwargs={'render_postcompile': True},
+    )
+
+    assert (
+        "to_tsvector('simple', todos.title || ' ' || todos.description)"
+        in str(query)
+    )
+
+
+def test_list_todos_search_rejects_cursor(client: TestClient, token: dict):
+    response = client.get(
+        '/todos/?q=milk&cursor=eyJpZCI6MX0',
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
 def test_delete_todo(
     session: Session, client: TestClient, user: User, token: dict
 ):
@@ -187,6 +344,41 @@ def test_patch_todo(
     assert response.json()['title'] == 'teste!'
 
 
+def test_patch_todo_without_changes_returns_todo(
+    client: TestClient, session: Session, user: User, token: dict
+):
+    todo = TodoFactory(user_id=user.id, title='unchanged')
+    session.add(todo)
+    session.commit()
+
+    response = client.patch(
+        f'/todos/{todo.id}',
+        json={},
+        headers={'Authorization': f'Bearer {token['access_token']}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['title'] == 'unchanged'
+
+
+def test_patch_todo_ignores_nulls(
+    client: TestClient, session: Session, user: User, token: dict
+):
+    todo = TodoFactory(user_id=user.id, title='kept', state=TodoState.todo)
+    session.add(todo)
+    session.commit()
+
+    response = client.patch(
+        f'/todos/{todo.id}',
+        json={'title': None, 'description': None, 'state': 'done'},
+        headers={'Authorization': f'Bearer {token['access_token']}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['title'] == 'kept'
+    assert response.json()['state'] == 'done'
+
+
 def test_patch_todo_error(
     client: TestClient, session: Session, user: User, token: dict
 ):
@@ -208,3 +400,487 @@ def test_delete_todo_error(client: TestClient, token: dict):
 
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert response.json() == {'detail': 'Task not found.'}
+
+
+def test_create_todos_batch(client: TestClient, user: User, token: dict):
+    todos = [
+        {'title': f'todo {i}', 'description': 'batch', 'state': 'todo'}
+        for i in range(3)
+    ]
+
+    response = client.post(
+        '/todos/batch',
+        json=todos,
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    created = response.json()
+    assert [todo['title'] for todo in created] == [
+        'todo 0',
+        'todo 1',
+        'todo 2',
+    ]
+    assert {todo['user_id'] for todo in created} == {user.id}
+    assert all(todo['id'] and todo['created_at'] for todo in created)
+
+
+def test_create_todos_batch_reports_invalid_items(
+    client: TestClient, token: dict
+):
+    response = client.post(
+        '/todos/batch',
+        json=[
+            {'title': 'ok', 'description': 'ok', 'state': 'todo'},
+            {'title': 'bad', 'description': 'bad', 'state': 'unknown'},
+        ],
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    [error] = response.json()['detail']
+    assert error['loc'] == ['body', 1, 'state']
+
+
+def test_create_todos_batch_rejects_oversized_batch(
+    client: TestClient, token: dict
+):
+    todo = {'title': 'todo', 'description': 'batch', 'state': 'todo'}
+    response = client.post(
+        '/todos/batch',
+        json=[todo] * (Settings().TODO_BATCH_MAX_SIZE + 1),
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_patch_todos_bulk_by_ids(
+    client: TestClient, session: Session, user: User, token: dict
+):
+    todos = TodoFactory.create_batch(3, user_id=user.id, state=TodoState.todo)
+    session.add_all(todos)
+    session.commit()
+
+    response = client.patch(
+        '/todos/',
+        json={
+            'ids': [todos[0].id, todos[1].id],
+            'update': {'state': 'done'},
+        },
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'count': 2}
+
+    response = client.get(
+        '/todos/?state=done',
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+    assert [todo['id'] for todo in response.json()['todos']] == [
+        todos[0].id,
+        todos[1].id,
+    ]
+
+
+def test_patch_todos_bulk_is_scoped_to_current_user(
+    client: TestClient,
+    session: Session,
+    user: User,
+    other_user: User,
+    token: dict,
+):
+    session.add_all(
+        TodoFactory.create_batch(
+            2, user_id=other_user.id, state=TodoState.todo
+        )
+        + TodoFactory.create_batch(1, user_id=user.id, state=TodoState.todo)
+    )
+    session.commit()
+
+    response = client.patch(
+        '/todos/',
+        json={'state': 'todo', 'update': {'title': 'mine'}},
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+
+    assert response.json() == {'count': 1}
+
+
+def test_patch_todos_bulk_requires_selection(client: TestClient, token: dict):
+    response = client.patch(
+        '/todos/',
+        json={'update': {'state': 'done'}},
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_patch_todos_bulk_ignores_nulls(
+    client: TestClient, session: Session, user: User, token: dict
+):
+    todo = TodoFactory(user_id=user.id, state=TodoState.todo)
+    session.add(todo)
+    session.commit()
+
+    response = client.patch(
+        '/todos/',
+        json={'ids': [todo.id], 'update': {'title': None}},
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()['detail'] == 'Nothing to update.'
+
+    response = client.patch(
+        '/todos/',
+        json={'ids': [todo.id], 'update': {'title': None, 'state': 'done'}},
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+    assert response.json() == {'count': 1}
+    session.refresh(todo)
+    assert todo.title
+    assert todo.state == TodoState.done
+
+
+def test_delete_todos_bulk_by_state(
+    client: TestClient, session: Session, user: User, token: dict
+):
+    session.add_all(
+        TodoFactory.create_batch(4, user_id=user.id, state=TodoState.trash)
+        + TodoFactory.create_batch(2, user_id=user.id, state=TodoState.todo)
+    )
+    session.commit()
+
+    response = client.delete(
+        '/todos/?state=trash',
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'count': 4}
+
+    response = client.get(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+    assert len(response.json()['todos']) == 2  # noqa: PLR2004
+
+
+def test_delete_todos_bulk_by_ids(
+    client: TestClient, session: Session, user: User, token: dict
+):
+    todos = TodoFactory.create_batch(3, user_id=user.id)
+    session.add_all(todos)
+    session.commit()
+
+    response = client.delete(
+        f'/todos/?ids={todos[0].id}&ids={todos[2].id}',
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+
+    assert response.json() == {'count': 2}
+
+
+def test_export_todos_ndjson(
+    client: TestClient, session: Session, user: User, token: dict
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    session.commit()
+
+    response = client.get(
+        '/todos/export',
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row['id'] for row in rows] == [1, 2, 3]
+    assert set(rows[0]) == {
+        'id',
+        'title',
+        'description',
+        'state',
+        'created_at',
+        'updated_at',
+    }
+    assert rows[0]['state'] in {state.value for state in TodoState}
+
+
+def test_export_todos_csv(
+    client: TestClient,
+    session: Session,
+    user: User,
+    other_user: User,
+    token: dict,
+):
+    session.add_all(
+        TodoFactory.create_batch(2, user_id=user.id, state=TodoState.done)
+        + TodoFactory.create_batch(2, user_id=other_user.id)
+    )
+    session.commit()
+
+    response = client.get(
+        '/todos/export?format=csv',
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row['id'] for row in rows] == ['1', '2']
+    assert {row['state'] for row in rows} == {'done'}
+
+
+def test_list_todos_etag_returns_304_until_todos_change(
+    client: TestClient, session: Session, user: User, token: dict
+):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    session.commit()
+
+    response = client.get('/todos/', headers=headers)
+    etag = response.headers['etag']
+
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['etag'] == etag
+    assert not response.content
+
+    client.patch(f'/todos/{todo.id}', json={'title': 'a'}, headers=headers)
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+    assert response.status_code == HTTPStatus.OK
+    etag = response.headers['etag']
+
+    # a second edit right after the first still changes the validator
+    client.patch(f'/todos/{todo.id}', json={'title': 'b'}, headers=headers)
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['todos'][0]['title'] == 'b'
+
+
+def test_list_todos_etag_depends_on_query(
+    client: TestClient, user: User, token: dict
+):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+
+    etag = client.get('/todos/', headers=headers).headers['etag']
+    response = client.get(
+        '/todos/?state=done', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_todo_stats_follow_every_write_path(
+    client: TestClient, user: User, token: dict
+):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    todo = {'title': 't', 'description': 'd', 'state': 'todo'}
+    created = client.post('/todos/', json=todo, headers=headers).json()
+    client.post('/todos/batch', json=[todo] * 3, headers=headers)
+    client.patch(
+        f'/todos/{created["id"]}', json={'state': 'done'}, headers=headers
+    )
+    client.patch(
+        '/todos/',
+        json={'ids': [2, 3], 'update': {'state': 'trash'}},
+        headers=headers,
+    )
+    client.delete('/todos/?state=trash&ids=2', headers=headers)
+
+    response = client.get('/todos/stats', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'counts': {
+            'draft': 0,
+            'todo': 1,
+            'doing': 0,
+            'done': 1,
+            'trash': 1,
+        },
+        'total': 3,
+    }
+
+
+def test_rebuild_counters_fixes_drift(
+    client: TestClient, session: Session, user: User, token: dict
+):
+    session.add_all(
+        TodoFactory.create_batch(2, user_id=user.id, state=TodoState.doing)
+    )
+    session.commit()
+    session.execute(delete(TodoCounter))
+    session.commit()
+
+    asyncio.run(rebuild_counters(ThreadedSession(session), user.id))
+
+    response = client.get(
+        '/todos/stats',
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+    assert response.json()['counts']['doing'] == 2  # noqa: PLR2004
+
+
+def archive_old_trash(session: Session, user: User) -> int:
+    old = datetime.datetime.now() - datetime.timedelta(days=40)
+    session.add_all(
+        TodoFactory.create_batch(3, user_id=user.id, state=TodoState.trash)
+        + TodoFactory.create_batch(1, user_id=user.id, state=TodoState.done)
+    )
+    session.commit()
+    session.execute(update(Todo).values(updated_at=old))
+    session.add(TodoFactory(user_id=user.id, state=TodoState.trash))
+    session.commit()
+
+    return asyncio.run(
+        archive_trash(ThreadedSession(session), datetime.timedelta(days=30), 2)
+    )
+
+
+def test_archive_trash_moves_only_old_trash(
+    client: TestClient, session: Session, user: User, token: dict
+):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+
+    assert archive_old_trash(session, user) == 3  # noqa: PLR2004
+
+    todos = client.get('/todos/', headers=headers).json()['todos']
+    assert [todo['state'] for todo in todos] == ['done', 'trash']
+    archived = client.get('/todos/archive', headers=headers).json()
+    assert [todo['id'] for todo in archived['todos']] == [1, 2, 3]
+    assert all(todo['archived_at'] for todo in archived['todos'])
+    stats = client.get('/todos/stats', headers=headers).json()
+    assert stats['counts']['trash'] == 1
+
+
+def test_restore_archived_todo(
+    client: TestClient,
+    session: Session,
+    user: User,
+    other_user: User,
+    token: dict,
+):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    archive_old_trash(session, user)
+    session.add(
+        ArchivedTodo(
+            title='x',
+            description='x',
+            state=TodoState.trash,
+            user_id=other_user.id,
+            created_at=datetime.datetime.now(),
+            updated_at=None,
+        )
+    )
+    session.commit()
+
+    response = client.post('/todos/archive/2/restore', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['state'] == 'todo'
+    archived = client.get('/todos/archive', headers=headers).json()
+    assert [todo['id'] for todo in archived['todos']] == [1, 3]
+    response = client.post('/todos/archive/4/restore', headers=headers)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_todo_changes_since_token(
+    client: TestClient, session: Session, user: User, token: dict
+):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    session.commit()
+    an_hour_ago = utcnow() - datetime.timedelta(hours=1)
+    session.execute(update(Todo).values(updated_at=an_hour_ago))
+    session.commit()
+
+    full = client.get('/todos/changes', headers=headers).json()
+    assert [todo['id'] for todo in full['todos']] == [1, 2, 3]
+    assert full['deleted'] == []
+    assert decode_since(full['next_since']) == an_hour_ago
+    since = encode_since(an_hour_ago + datetime.timedelta(minutes=30))
+
+    client.patch('/todos/1', json={'title': 'changed'}, headers=headers)
+    client.delete('/todos/2', headers=headers)
+    client.post(
+        '/todos/',
+        json={'title': 't', 'description': 'd', 'state': 'todo'},
+        headers=headers,
+    )
+    response = client.get(
+        '/todos/changes',
+        params={'since': since},
+        headers=headers,
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    changes = response.json()
+    assert [todo['id'] for todo in changes['todos']] == [1, 4]
+    assert changes['todos'][0]['title'] == 'changed'
+    assert changes['deleted'] == [2]
+    assert decode_since(changes['next_since']) > decode_since(since)
+
+
+def test_todo_changes_rejects_bad_and_expired_tokens(
+    client: TestClient, token: dict
+):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    expired = encode_since(datetime.datetime(2000, 1, 1))
+
+    response = client.get('/todos/changes?since=nope', headers=headers)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()['detail'] == 'Invalid since token.'
+    response = client.get(f'/todos/changes?since={expired}', headers=headers)
+    assert response.status_code == HTTPStatus.GONE
+
+
+def test_todo_changes_accepts_tokens_with_utc_offset(
+    client: TestClient, token: dict
+):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    an_hour_ago = utcnow() - datetime.timedelta(hours=1)
+    aware = an_hour_ago.replace(tzinfo=datetime.UTC).astimezone(
+        datetime.timezone(datetime.timedelta(hours=-3))
+    )
+
+    response = client.get(
+        '/todos/changes',
+        params={'since': encode_since(aware)},
+        headers=headers,
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert decode_since(response.json()['next_since']) == an_hour_ago
+
+
+def test_patch_todo_ignores_client_updated_at(
+    client: TestClient, session: Session, user: User, token: dict
+):
+    headers = {'Authorization': f'Bearer {token["access_token"]}'}
+    session.add(TodoFactory(user_id=user.id))
+    session.commit()
+    since = encode_since(utcnow() - datetime.timedelta(minutes=5))
+
+    response = client.patch(
+        '/todos/1',
+        json={'title': 'z', 'updated_at': '2000-01-01T00:00:00'},
+        headers=headers,
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert not response.json()['updated_at'].startswith('2000')
+    changes = client.get(
+        '/todos/changes', params={'since': since}, headers=headers
+    ).json()
+    assert [todo['title'] for todo in changes['todos']] == ['z']
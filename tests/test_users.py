@@ -1,3 +1,4 @@
+import base64
 from http import HTTPStatus
 
 from fastapi.testclient import TestClient
@@ -51,6 +52,26 @@ def test_read_user_by_id(client: TestClient, user: User):
     assert response.json() == user_schema
 
 
+def test_read_user_by_id_etag(client: TestClient, user: User, token):
+    etag = client.get(f'/users/{user.id}').headers['etag']
+
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    client.put(
+        f'/users/{user.id}',
+        json={
+            'username': 'bob',
+            'email': 'bob@example.com',
+            'password': 'mynewpassword',
+        },
+        headers={'Authorization': f'Bearer {token["access_token"]}'},
+    )
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['username'] == 'bob'
+
+
 def test_read_user_by_id_fail(client: TestClient):
     response = client.get('/users/1')
     assert response.status_code == HTTPStatus.NOT_FOUND
@@ -62,14 +83,56 @@ def test_read_users(client: TestClient, user: User, other_user: User):
     other_user_schema = UserPublic.model_validate(other_user).model_dump()
     response = client.get('/users')
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': [user_schema, other_user_schema]}
+    assert response.json() == {
+        'users': [user_schema, other_user_schema],
+        'next_cursor': None,
+    }
 
 
 def test_read_users_with_user(client: TestClient, user: User):
     user_schema = UserPublic.model_validate(user).model_dump()
     response = client.get('/users')
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': [user_schema]}
+    assert response.json() == {'users': [user_schema], 'next_cursor': None}
+
+
+def test_read_users_cursor_pagination(
+    client: TestClient, user: User, other_user: User
+):
+    response = client.get('/users/?limit=1')
+    assert response.status_code == HTTPStatus.OK
+    assert [u['id'] for u in response.json()['users']] == [user.id]
+    next_cursor = response.json()['next_cursor']
+    assert next_cursor
+
+    response = client.get(f'/users/?limit=1&cursor={next_cursor}')
+    assert [u['id'] for u in response.json()['users']] == [other_user.id]
+    assert response.json()['next_cursor'] is None
+
+
+def test_read_users_zero_or_negative_limit_is_an_empty_page(
+    client: TestClient, user: User
+):
+    for limit in (0, -1):
+        response = client.get(f'/users/?limit={limit}')
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == {'users': [], 'next_cursor': None}
+
+
+def test_read_users_invalid_cursor(client: TestClient):
+    response = client.get('/users/?cursor=not-a-cursor')
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()['detail'] == 'Invalid cursor.'
+
+
+def test_read_users_rejects_bool_and_out_of_range_cursor_ids(
+    client: TestClient, user: User
+):
+    for last_id in ('true', str(10**30)):
+        cursor = base64.urlsafe_b64encode(f'{{"id":{last_id}}}'.encode())
+        response = client.get(f'/users/?cursor={cursor.decode()}')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json()['detail'] == 'Invalid cursor.'
 
 
 def test_update_user(client: TestClient, user: User, token):
@@ -90,6 +153,22 @@ def test_update_user(client: TestClient, user: User, token):
     }
 
 
+def test_update_user_fail_with_taken_username(
+    client: TestClient, user: User, other_user: User, token
+):
+    response = client.put(
+        f'/users/{user.id}',
+        json={
+            'username': other_user.username,
+            'email': 'bob@example.com',
+            'password': 'mynewpassword',
+        },
+        headers={'Authorization': f'Bearer {token['access_token']}'},
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()['detail'] == 'Username already exists.'
+
+
 def test_update_wrong_user(client: TestClient, other_user: User, token):
     response = client.put(
         f'users/{other_user.id}',
@@ -112,6 +191,30 @@ def test_delete_user(client: TestClient, user: User, token):
     assert response.status_code == HTTPStatus.OK
     assert response.json() == {'message': 'User deleted'}
 
+    # soft deleted: gone for the API until the jobs purge the row
+    assert client.get('/users/1').status_code == HTTPStatus.NOT_FOUND
+    assert client.get('/users/').json()['users'] == []
+
+
+def test_delete_user_frees_username_and_email(
+    client: TestClient, user: User, token
+):
+    client.delete(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token['access_token']}'},
+    )
+
+    response = client.post(
+        '/users/',
+        json={
+            'username': user.username,
+            'email': user.email,
+            'password': 'newpassword',
+        },
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json()['id'] != user.id
+
 
 def test_delete_wrong_user(client: TestClient, other_user: User, token):
     response = client.delete(
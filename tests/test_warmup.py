@@ -0,0 +1,35 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from prometheus_client import REGISTRY
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from fast_api.security import password_hasher
+from fast_api.warmup import common_statements, warmup
+
+
+def test_warmup_fills_pool_and_compiled_cache(session: Session, database_path):
+    engine = create_async_engine(f'sqlite+aiosqlite:///{database_path}')
+
+    @asynccontextmanager
+    async def session_factory(read_only=False):
+        async with AsyncSession(engine, expire_on_commit=False) as s:
+            yield s
+
+    async def run():
+        await warmup(session_factory, engine, connections=2)
+        pooled = engine.pool.checkedin()
+        compiled = len(engine.sync_engine._compiled_cache)
+        await engine.dispose()
+        return pooled, compiled
+
+    completed = password_hasher.completed
+    pooled, compiled = asyncio.run(run())
+
+    assert pooled == 2  # noqa: PLR2004
+    assert compiled >= len(common_statements())
+    assert password_hasher.completed > completed
+    assert REGISTRY.get_sample_value(
+        'app_startup_seconds', {'phase': 'warmup'}
+    )